@@ -6,270 +6,753 @@
 __author__ = """Larissa Triess"""
 __email__ = "larissa@triess.eu"
 
+import functools
 import os
 import sys
 
 import click
 import numpy as np
 from data import (
-    azimuth_bins,
-    distance_bins,
-    elevation_bins,
-    get_num_learning_labels,
-    load_data_labels,
-    load_data_points,
-    map_learning,
+    find_sequences,
+    get_scan_filenames,
+    get_shard,
+    load_label_mapping,
+    load_sequence_poses,
+)
+from utils import (
+    PlotRenderer,
+    TrackState,
+    accumulate,
+    accumulate_squares,
+    axis_registry,
+    complete_statistics,
+    compute_cached,
+    compute_chunked_statistics,
+    compute_scan_statistics,
+    create_pool,
+    create_squares,
+    create_statistics,
+    default_axes,
+    distribution_quantities,
+    estimate_statistics,
+    export_csv,
+    find_partials,
+    format_summary,
+    frame_statistics,
+    get_axes,
+    get_axis_key,
+    get_bev_heatmaps,
+    get_cache_dir,
+    get_collision_rate,
+    get_empty_pixel_rate,
+    get_quantiles,
+    get_relative_error,
+    get_sequence_key,
+    get_sequence_statistics,
+    get_stored_axes,
+    get_stored_sequences,
+    get_summary,
+    get_total_intervals,
+    get_total_statistics,
+    interval_suffix,
+    iterate_statistics,
+    load_statistics,
+    map_scans,
+    merge_partials,
+    profile_key,
+    profile_scan,
+    profiler,
+    sample_scans,
+    save_partial,
+    save_statistics,
+    write_trace,
 )
-from utils import get_angle_label_stats, get_distance_label_stats, plots
 
 
-@click.command()
-@click.argument("path", type=click.Path(exists=True))
-@click.option(
-    "--mode",
-    type=click.Choice(["compute", "from_data"]),
-    default="compute",
-    help="If compute is selected, PATH must be the path to the dataset. All statistics "
-    "will be calculated from the data. If from_data is selected, PATH must be a "
-    "a folder in which csv files with the computed statistics are located.",
-)
-@click.option(
-    "--save_dir",
-    type=click.Path(dir_okay=True),
-    help="Path where to save the generated graphs. If not provided, show on display.",
-)
-def analyse(path, mode, save_dir):
+def get_plot_filename(save_dir: str, name: str) -> str:
+    """ Return the filename to save a plot to or None to show it on display """
+    return os.path.join(save_dir, name) if save_dir is not None else None
+
+
+def parse_sequences(ctx, param, value) -> list:
+    if value is None:
+        return None
+    sequences = []
+    try:
+        for part in value.split(","):
+            first, _, last = part.partition("-")
+            sequences.extend(range(int(first), int(last or first) + 1))
+    except ValueError:
+        raise click.BadParameter("must be a list of ids and ranges, e.g. 0-7,9,10")
+    if not all(0 <= s < 100 for s in sequences):
+        raise click.BadParameter("sequence ids must be between 0 and 99")
+    return sorted(set(sequences))
+
+
+def parse_shard(ctx, param, value) -> (int, int):
+    if value is None:
+        return None
+    try:
+        shard, num_shards = (int(v) for v in value.split("/"))
+    except ValueError:
+        raise click.BadParameter("must be of the form i/N, e.g. 0/4")
+    if not 0 <= shard < num_shards:
+        raise click.BadParameter("i must be between 0 and N - 1")
+    return shard, num_shards
+
+
+def analyse(
+    path: str,
+    mode: str = "compute",
+    sequences: list = None,
+    save_dir: str = None,
+    mapping: str = None,
+    workers: int = 1,
+    mmap: bool = False,
+    chunk_size: int = None,
+    shard: (int, int) = None,
+    sample_every: int = None,
+    sample_fraction: float = None,
+    seed: int = 0,
+    cache_dir: str = None,
+    csv: bool = False,
+    prefetch: int = 4,
+    axis: tuple = (),
+    joint: bool = False,
+    instances: bool = False,
+    tracks: bool = False,
+    voxels: bool = False,
+    range_image: bool = False,
+    distributions: bool = False,
+    profile: bool = False,
+    profile_trace: str = None,
+    no_plots: bool = False,
+    plot_workers: int = 2,
+):
+    """ Analyse the sequences and compute the total statistics
+
+    In compute mode, PATH is the dataset and the statistics are computed from the
+    scans, in from_data mode PATH holds the statistics of an earlier run. The options
+    are those of the compute and plot commands.
+    """
+
+    if mapping is not None:
+        load_label_mapping(mapping)
+
+    profiler.enabled = profile or profile_trace is not None
+
+    pool = (
+        create_pool(workers, mapping, profile=profiler.enabled)
+        if mode == "compute"
+        else None
+    )
+
+    if mode == "from_data":
+        try:
+            stored = load_statistics(path)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        axes = get_stored_axes(stored)
+    else:
+        axes = get_axes(axis)
 
     sequence_folder = os.path.join(path, "dataset", "sequences")
+    if mode == "from_data":
+        available = get_stored_sequences(stored)
+        missing = sorted(set(sequences or []) - set(available))
+        if missing:
+            raise click.UsageError(
+                "Sequences {m} are not contained in {p}".format(m=missing, p=path)
+            )
+    else:
+        available = (
+            find_sequences(sequence_folder) if os.path.isdir(sequence_folder) else []
+        )
+    if sequences is None:
+        sequences = available
+    if not sequences:
+        raise click.UsageError("No sequences found in {p}".format(p=path))
+
+    if shard is not None and (mode != "compute" or save_dir is None):
+        raise click.UsageError("--shard needs compute mode and --save_dir")
+    sampling = sample_every is not None or sample_fraction is not None
+    if tracks and (sampling or shard is not None or chunk_size is not None):
+        raise click.UsageError(
+            "--tracks needs all scans in order and cannot be used with sampling, "
+            "--shard or --chunk_size"
+        )
+    if sampling and (
+        mode != "compute"
+        or joint
+        or voxels
+        or range_image
+        or distributions
+        or shard is not None
+    ):
+        raise click.UsageError(
+            "Sampling needs compute mode and cannot be used with --joint, --voxels, "
+            "--range_image, --distributions or --shard"
+        )
+    if sample_every is not None and sample_fraction is not None:
+        raise click.UsageError("Use either --sample_every or --sample_fraction")
+    if sample_fraction == 0.0:
+        raise click.BadParameter(
+            "must be larger than 0", param_hint="--sample_fraction"
+        )
+    whole_scans = "instance_size" in axes or instances or range_image
+    if chunk_size is not None and whole_scans:
+        raise click.UsageError(
+            "--instances, --range_image and --axis instance_size need whole scans and "
+            "cannot be used with --chunk_size"
+        )
+
+    if chunk_size is not None:
+        scan_func = functools.partial(
+            compute_chunked_statistics,
+            chunk_size=chunk_size,
+            mmap=mmap,
+            axes=axes,
+            joint=joint,
+            voxels=voxels,
+            distributions=distributions,
+        )
+    else:
+        scan_func = functools.partial(
+            compute_scan_statistics,
+            mmap=mmap,
+            axes=axes,
+            joint=joint,
+            instances=instances,
+            tracks=tracks,
+            voxels=voxels,
+            range_image=range_image,
+            distributions=distributions,
+        )
+    if cache_dir is not None:
+        # cached statistics of other axes (joint histogram) or options are recomputed
+        expected = create_statistics(
+            axes,
+            joint=joint,
+            instances=instances,
+            voxels=voxels,
+            range_image=range_image,
+            distributions=distributions,
+        )
+        scan_func = functools.partial(
+            compute_cached,
+            func=scan_func,
+            cache_dir=get_cache_dir(cache_dir),
+            keys=list(expected) + (frame_statistics if tracks else []),
+            expected=expected,
+        )
+    if pool is not None and profiler.enabled:
+        scan_func = functools.partial(profile_scan, func=scan_func)
 
-    # placeholder for overall stats
-    pplds = np.zeros(
-        [11, get_num_learning_labels(), len(distance_bins)], dtype=np.int64
+    renderer = PlotRenderer(
+        workers=plot_workers if save_dir is not None else 0,
+        mapping=mapping,
+        enabled=not no_plots and shard is None,
     )
 
-    # iterate over all train/val sequences
-    for s in range(11):
+    if save_dir is not None and not os.path.exists(save_dir):
+        os.makedirs(save_dir)
+
+    statistics = {}
+
+    # scans of the dataset and the scans processed by this shard
+    dataset_scans = []
+    scans = []
+
+    # iterate over the selected sequences
+    for s in sequences:
+        profiler.sequence = s
         if mode == "compute":
             print("\nSequence {seq}".format(seq=s))
 
-            point_dir = os.path.join(sequence_folder, "{0:02d}".format(s), "velodyne")
-            label_dir = os.path.join(sequence_folder, "{0:02d}".format(s), "labels")
-
-            if not os.path.exists(point_dir):
-                raise NotADirectoryError(
-                    "Directory for points does not exits: {dir}".format(dir=point_dir)
+            sequence_dir = os.path.join(sequence_folder, "{0:02d}".format(s))
+            with profiler.stage("listing"):
+                filenames = get_scan_filenames(sequence_dir)
+            if shard is not None:
+                dataset_scans.extend(
+                    os.path.relpath(f, sequence_folder) for f, _ in filenames
                 )
-            if not os.path.exists(label_dir):
-                raise NotADirectoryError(
-                    "Directory for labels does not exits: {dir}".format(dir=label_dir)
-                )
-            if save_dir is not None and not os.path.exists(save_dir):
-                os.makedirs(save_dir)
+                filenames = get_shard(filenames, *shard)
+                scans.extend(os.path.relpath(f, sequence_folder) for f, _ in filenames)
 
-            points_per_distance = np.zeros(len(distance_bins), dtype=np.int64)
-            points_per_label = np.zeros(get_num_learning_labels(), dtype=np.int64)
-            points_per_label_distance = np.zeros(
-                [get_num_learning_labels(), len(distance_bins)], dtype=np.int64
-            )
-            points_per_label_azimuth = np.zeros(
-                [get_num_learning_labels(), len(azimuth_bins)], dtype=np.int64
+            num_scans = len(filenames)
+            filenames = sample_scans(
+                filenames, every=sample_every, fraction=sample_fraction, seed=(seed, s)
             )
-            points_per_label_elevation = np.zeros(
-                [get_num_learning_labels(), len(elevation_bins) + 1], dtype=np.int64
+
+            statistics_sequence = create_statistics(
+                axes,
+                joint=joint,
+                instances=instances,
+                voxels=voxels,
+                range_image=range_image,
+                distributions=distributions,
             )
+            squares = create_squares(statistics_sequence) if sampling else None
 
-            point_filenames = sorted(os.listdir(point_dir))
-            label_filenames = sorted(os.listdir(label_dir))
-            for c, (point_file, label_file) in enumerate(
-                zip(point_filenames, label_filenames)
-            ):
-                sys.stdout.write("\r{0:4d} / {1:4d}".format(c, len(point_filenames)))
-
-                point_filename = os.path.join(point_dir, point_file)
-                label_filename = os.path.join(label_dir, label_file)
-
-                if (
-                    not os.path.splitext(point_file)[0]
-                    == os.path.splitext(label_file)[0]
-                ):
-                    raise ValueError(
-                        "Point list file {pf} does not match label file {lf}".format(
-                            pf=point_filename, lf=label_filename
-                        )
+            track_state = TrackState()
+            poses = load_sequence_poses(sequence_dir) if tracks else None
+            if poses is not None and poses.shape[0] != len(filenames):
+                raise ValueError(
+                    "Number of poses and scans do not match in {d}".format(
+                        d=sequence_dir
                     )
-
-                sensor, intensity = load_data_points(point_filename)
-                semantics, instance = load_data_labels(label_filename)
-
-                semantics = map_learning(semantics)
-                ppd, ppl, ppld = get_distance_label_stats(sensor, semantics)
-                ppla, pple = get_angle_label_stats(sensor, semantics)
-
-                points_per_distance = np.add(points_per_distance, ppd)
-                points_per_label = np.add(points_per_label, ppl)
-                points_per_label_distance = np.add(points_per_label_distance, ppld)
-                points_per_label_azimuth = np.add(points_per_label_azimuth, ppla)
-                points_per_label_elevation = np.add(points_per_label_elevation, pple)
-
-            # save the data
-            if save_dir is not None:
-                np.savetxt(
-                    os.path.join(save_dir, "{0:02d}_points_per_distance.csv".format(s)),
-                    points_per_distance,
-                    delimiter=",",
-                )
-                np.savetxt(
-                    os.path.join(save_dir, "{0:02d}_points_per_label.csv".format(s)),
-                    points_per_label,
-                    delimiter=",",
                 )
-                np.savetxt(
-                    os.path.join(
-                        save_dir, "{0:02d}_distance_label_matrix.csv".format(s)
-                    ),
-                    points_per_label_distance,
-                    delimiter=",",
+
+            if pool is None and cache_dir is None and chunk_size is None:
+                scan_statistics = iterate_statistics(
+                    filenames,
+                    prefetch=prefetch,
+                    mmap=mmap,
+                    axes=axes,
+                    joint=joint,
+                    instances=instances,
+                    tracks=tracks,
+                    voxels=voxels,
+                    range_image=range_image,
+                    distributions=distributions,
                 )
-                np.savetxt(
-                    os.path.join(
-                        save_dir, "{0:02d}_azimuth_label_matrix.csv".format(s)
-                    ),
-                    points_per_label_azimuth,
-                    delimiter=",",
+            else:
+                scan_statistics = map_scans(scan_func, filenames, pool=pool)
+
+            # the partial results arrive in scan order, so the sums are deterministic
+            for c, partials in enumerate(scan_statistics):
+                sys.stdout.write("\r{0:4d} / {1:4d}".format(c, len(filenames)))
+                profiler.add(partials.pop(profile_key, []), sequence=s)
+                if tracks:
+                    track_state.update(
+                        *[partials.pop(key) for key in frame_statistics],
+                        pose=None if poses is None else poses[c],
+                    )
+                accumulate(statistics_sequence, partials)
+                if sampling:
+                    accumulate_squares(squares, partials)
+
+            if tracks:
+                statistics_sequence.update(track_state.get_statistics())
+
+            if sampling:
+                statistics_sequence, intervals = estimate_statistics(
+                    statistics_sequence, squares, len(filenames), num_scans
                 )
-                np.savetxt(
-                    os.path.join(
-                        save_dir, "{0:02d}_elevation_label_matrix.csv".format(s)
-                    ),
-                    points_per_label_elevation,
-                    delimiter=",",
+                for name, value in intervals.items():
+                    statistics[get_sequence_key(s, name + interval_suffix)] = value
+                print(
+                    "\nEstimated from {n} of {N} scans, points per label within "
+                    "+-{e:.1%} (median, 95% confidence)".format(
+                        n=len(filenames),
+                        N=num_scans,
+                        e=get_relative_error(
+                            statistics_sequence["points_per_label"],
+                            intervals["points_per_label"],
+                        ),
+                    )
                 )
 
         elif mode == "from_data":
-            points_per_distance = np.loadtxt(
-                os.path.join(path, "{0:02d}_points_per_distance.csv".format(s)),
-                delimiter=",",
-            )
-            points_per_label = np.loadtxt(
-                os.path.join(path, "{0:02d}_points_per_label.csv".format(s)),
-                delimiter=",",
-            )
-            points_per_label_distance = np.loadtxt(
-                os.path.join(path, "{0:02d}_distance_label_matrix.csv".format(s)),
-                delimiter=",",
-            )
-            points_per_label_azimuth = np.loadtxt(
-                os.path.join(path, "{0:02d}_azimuth_label_matrix.csv".format(s)),
-                delimiter=",",
-            )
-            points_per_label_elevation = np.loadtxt(
-                os.path.join(path, "{0:02d}_elevation_label_matrix.csv".format(s)),
-                delimiter=",",
-            )
+            statistics_sequence = get_sequence_statistics(stored, s)
         else:
             raise ValueError
 
-        pplds[s] = points_per_label_distance
+        # the label matrices of a joint run are marginals of the joint histogram
+        statistics_sequence = complete_statistics(statistics_sequence, axes)
+
+        for name, value in statistics_sequence.items():
+            statistics[get_sequence_key(s, name)] = value
 
         # visualize the data
-        plots.draw_distance_and_label_matrix(
-            points_per_label_distance,
-            save_dir=os.path.join(save_dir, "{0:02d}_distance_label_matrix".format(s))
-            if save_dir is not None
-            else None,
-        )
-        plots.draw_points_per_distance(
-            points_per_distance,
-            save_dir=os.path.join(save_dir, "{0:02d}_points_per_distance.".format(s))
-            if save_dir is not None
-            else None,
-        )
-        plots.draw_points_per_label(
-            points_per_label,
-            save_dir=os.path.join(save_dir, "{0:02d}_points_per_label".format(s))
-            if save_dir is not None
-            else None,
-        )
-        plots.draw_azimuth_and_label_matrix(
-            points_per_label_azimuth,
-            save_dir=os.path.join(save_dir, "{0:02d}_azimuth_label_matrix".format(s))
-            if save_dir is not None
-            else None,
-        )
-        plots.draw_elevation_and_label_matrix(
-            points_per_label_elevation,
-            save_dir=os.path.join(save_dir, "{0:02d}_elevation_label_matrix".format(s))
-            if save_dir is not None
-            else None,
-        )
+        with profiler.stage("plots"):
+            for name, draw in [
+                ("distance_label_matrix", "draw_distance_and_label_matrix"),
+                ("points_per_distance", "draw_points_per_distance"),
+                ("points_per_label", "draw_points_per_label"),
+                ("azimuth_label_matrix", "draw_azimuth_and_label_matrix"),
+                ("elevation_label_matrix", "draw_elevation_and_label_matrix"),
+            ]:
+                renderer.draw(
+                    draw,
+                    statistics_sequence[name],
+                    save_dir=get_plot_filename(save_dir, get_sequence_key(s, name)),
+                )
+            for name in axes:
+                if name in default_axes:
+                    continue
+                renderer.draw(
+                    "draw_axis_and_label_matrix",
+                    statistics_sequence[get_axis_key(name)],
+                    name,
+                    save_dir=get_plot_filename(
+                        save_dir, get_sequence_key(s, get_axis_key(name))
+                    ),
+                )
+
+        if profiler.enabled:
+            records = profiler.get_records(s)
+            print("\n" + format_summary("Sequence {0:02d}".format(s), records))
+
+    if pool is not None:
+        pool.close()
+        pool.join()
 
     print("\n")
     print("Finished all sequences. Starting total analysis...")
+    profiler.sequence = None
 
-    ppld = np.sum(pplds, axis=0)  # total points per label distance
-    ppl = np.sum(ppld, axis=1)  # total points per label
-    ppd = np.sum(ppld, axis=0)  # total points per distance
-
-    ppds = np.sum(pplds, axis=1)  # points per distance sequence
-    ppls = np.sum(pplds, axis=2)  # points per label sequence
+    statistics.update(get_total_statistics(statistics, sequences))
+    # estimated statistics of a sampling run have confidence intervals
+    if any(key.endswith(interval_suffix) for key in statistics):
+        statistics.update(get_total_intervals(statistics, sequences))
+    ppld = statistics["total_distance_label_matrix"]
+    ppd = statistics["total_points_per_distance"]
+    ppl = statistics["total_points_per_label"]
+    ppds = statistics["sequence_distance_matrix"]
+    ppls = statistics["sequence_label_matrix"]
 
     # save the data
-    if save_dir is not None:
-        np.savetxt(
-            os.path.join(save_dir, "total_distance_label_matrix.csv"),
+    if shard is not None:
+        with profiler.stage("output"):
+            filename = save_partial(
+                save_dir, statistics, *shard, scans=scans, dataset_scans=dataset_scans
+            )
+        print("Saved the partial result to {f}".format(f=filename))
+    elif save_dir is not None and mode == "compute":
+        # plot only draws, the statistics it read are never overwritten
+        with profiler.stage("output"):
+            save_statistics(save_dir, statistics)
+            if csv:
+                export_csv(save_dir, statistics)
+
+    # visualize the data
+    with profiler.stage("plots"):
+        renderer.draw(
+            "draw_distance_and_label_matrix",
             ppld,
-            delimiter=",",
+            save_dir=get_plot_filename(save_dir, "total_distance_label_matrix"),
         )
-        np.savetxt(
-            os.path.join(save_dir, "total_points_per_distance.csv"), ppd, delimiter=","
+        renderer.draw(
+            "draw_points_per_distance",
+            ppd,
+            save_dir=get_plot_filename(save_dir, "total_points_per_distance"),
         )
-        np.savetxt(
-            os.path.join(save_dir, "total_points_per_label.csv"), ppl, delimiter=","
+        renderer.draw(
+            "draw_points_per_label",
+            ppl,
+            save_dir=get_plot_filename(save_dir, "total_points_per_label"),
         )
 
-        np.savetxt(
-            os.path.join(save_dir, "sequence_distance_matrix.csv"), ppds, delimiter=","
+        renderer.draw(
+            "draw_distance_and_sequence_matrix",
+            ppds,
+            sequences,
+            save_dir=get_plot_filename(save_dir, "sequence_distance_matrix"),
         )
-        np.savetxt(
-            os.path.join(save_dir, "sequence_label_matrix.csv"), ppls, delimiter=","
+        renderer.draw(
+            "draw_label_and_sequence_matrix",
+            ppls,
+            sequences,
+            save_dir=get_plot_filename(save_dir, "sequence_label_matrix"),
+        )
+        if renderer.enabled and "total_voxel_histogram" in statistics:
+            renderer.draw(
+                "draw_bev_label_heatmaps",
+                get_bev_heatmaps(statistics["total_voxel_histogram"]),
+                save_dir=get_plot_filename(save_dir, "total_bev_label_heatmaps"),
+            )
+        if renderer.enabled and "total_range_image_scans" in statistics:
+            num_scans = int(statistics["total_range_image_scans"][0])
+            renderer.draw(
+                "draw_range_image_statistics",
+                get_empty_pixel_rate(
+                    statistics["total_range_image_label_histogram"], num_scans
+                ),
+                get_collision_rate(
+                    statistics["total_range_image_collision_histogram"], num_scans
+                ),
+                save_dir=get_plot_filename(save_dir, "total_range_image"),
+            )
+        for name in distribution_quantities:
+            if not renderer.enabled or "total_" + name + "_sketch" not in statistics:
+                continue
+            moments = statistics["total_" + name + "_moments"]
+            renderer.draw(
+                "draw_label_distribution",
+                get_quantiles(
+                    statistics["total_" + name + "_sketch"],
+                    [0.01, 0.25, 0.5, 0.75, 0.99],
+                ),
+                np.where(moments.count > 0, moments.mean, np.nan),
+                name,
+                save_dir=get_plot_filename(save_dir, "total_" + name + "_distribution"),
+            )
+        renderer.draw(
+            "draw_sequence_length",
+            save_dir=get_plot_filename(save_dir, "sequence_length"),
         )
 
-    # visualize the data
-    plots.draw_distance_and_label_matrix(
-        ppld,
-        save_dir=os.path.join(save_dir, "total_distance_label_matrix")
-        if save_dir is not None
-        else None,
-    )
-    plots.draw_points_per_distance(
-        ppd,
-        save_dir=os.path.join(save_dir, "total_points_per_distance")
-        if save_dir is not None
-        else None,
-    )
-    plots.draw_points_per_label(
-        ppl,
-        save_dir=os.path.join(save_dir, "total_points_per_label")
-        if save_dir is not None
-        else None,
-    )
+    # wait for the plots that are rendered in the background
+    with profiler.stage("plot rendering"):
+        renderer.close()
 
-    plots.draw_distance_and_sequence_matrix(
-        ppds,
-        save_dir=os.path.join(save_dir, "sequence_distance_matrix")
-        if save_dir is not None
-        else None,
-    )
-    plots.draw_label_and_sequence_matrix(
-        ppls,
-        save_dir=os.path.join(save_dir, "sequence_label_matrix")
-        if save_dir is not None
-        else None,
-    )
-    plots.draw_sequence_length(
-        save_dir=os.path.join(path, "sequence_length") if save_dir is not None else None
-    )
+    if profiler.enabled:
+        print("\n" + format_summary("Total", profiler.get_records()))
+    if profile_trace is not None:
+        write_trace(profile_trace, profiler.get_records())
+
+
+def output_options(func):
+    """ Options of the compute and plot commands """
+    for option in reversed(
+        [
+            click.option(
+                "--sequences",
+                callback=parse_sequences,
+                help="Sequences to analyse as a list of ids and ranges, e.g. 0-7,9,10. "
+                "If not provided, all available sequences are analysed.",
+            ),
+            click.option(
+                "--save_dir",
+                type=click.Path(dir_okay=True),
+                help="Path where to save the generated graphs and, with compute, the "
+                "statistics. If not provided, show on display.",
+            ),
+            click.option(
+                "--mapping",
+                type=click.Path(exists=True, dir_okay=False),
+                help="semantic-kitti.yaml style file with a learning_map to map the "
+                "raw labels. If not provided, the built-in mapping is used.",
+            ),
+            click.option(
+                "--profile",
+                is_flag=True,
+                help="Measure wall time, bytes read and points processed per stage and "
+                "print a summary per sequence and in total.",
+            ),
+            click.option(
+                "--profile_trace",
+                type=click.Path(dir_okay=False),
+                help="Save the profiling records to this file in the Chrome trace "
+                "format. Implies --profile.",
+            ),
+            click.option(
+                "--plot_workers",
+                type=click.IntRange(min=0),
+                default=2,
+                help="Number of processes that render the plots in the background if "
+                "SAVE_DIR is set. 0 renders them in the main process.",
+            ),
+        ]
+    ):
+        func = option(func)
+    return func
+
+
+@click.group()
+def cli():
+    """ Statistics of the Semantic KITTI dataset
+
+    The plotting stack is only loaded by commands that draw plots.
+    """
+
+
+@cli.command()
+@click.argument("path", type=click.Path(exists=True))
+@output_options
+@click.option(
+    "--csv",
+    is_flag=True,
+    help="Additionally save every statistic as a csv file in SAVE_DIR.",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Number of processes the scans are distributed to.",
+)
+@click.option(
+    "--mmap",
+    is_flag=True,
+    help="Memory-map the scan files instead of reading them into memory.",
+)
+@click.option(
+    "--chunk_size",
+    type=click.IntRange(min=1),
+    help="Process every point and label file in chunks of this many points. Bounds "
+    "the memory for files that hold many concatenated scans (shards).",
+)
+@click.option(
+    "--shard",
+    callback=parse_shard,
+    help="Only process the i-th of N parts of the scans of every sequence (i/N, "
+    "starting at 0) and save a partial result to SAVE_DIR. The partial results of "
+    "all N shards are combined with the merge command.",
+)
+@click.option(
+    "--sample_every",
+    type=click.IntRange(min=1),
+    help="Only process every k-th scan of each sequence and estimate the statistics "
+    "of all scans from them.",
+)
+@click.option(
+    "--sample_fraction",
+    type=click.FloatRange(min=0.0, max=1.0),
+    help="Only process a random fraction of the scans of each sequence, stratified "
+    "over the sequence, and estimate the statistics of all scans from them.",
+)
+@click.option(
+    "--seed",
+    type=int,
+    default=0,
+    help="Seed of the random sampling with --sample_fraction.",
+)
+@click.option(
+    "--cache_dir",
+    type=click.Path(file_okay=False),
+    help="Directory to cache the statistics of every scan. Reruns only compute scans "
+    "that changed since they were cached and interrupted runs resume.",
+)
+@click.option(
+    "--prefetch",
+    type=click.IntRange(min=0),
+    default=4,
+    help="Number of scans that are read ahead in the background when computing "
+    "with a single worker and without cache. 0 disables reading ahead.",
+)
+@click.option(
+    "--axis",
+    type=click.Choice([a for a in axis_registry if a not in default_axes]),
+    multiple=True,
+    help="Additional axis to compute a label matrix for, can be given multiple times. "
+    "All axes are computed in the same pass over the data.",
+)
+@click.option(
+    "--joint",
+    is_flag=True,
+    help="Bin the points jointly over the labels and all axes into a sparse "
+    "histogram per sequence. All label matrices are derived from it.",
+)
+@click.option(
+    "--instances",
+    is_flag=True,
+    help="Additionally compute statistics over the instances per label: their number, "
+    "their number of points, the range of their center and their extent.",
+)
+@click.option(
+    "--tracks",
+    is_flag=True,
+    help="Additionally compute statistics over the instance tracks of every sequence: "
+    "their lifetime, reappearances, moving and static instances per scan and, if "
+    "poses.txt is present, their displacement.",
+)
+@click.option(
+    "--voxels",
+    is_flag=True,
+    help="Additionally count the points per label in the voxels of a grid around the "
+    "sensor and plot the bird's eye view heatmap of every label.",
+)
+@click.option(
+    "--range_image",
+    is_flag=True,
+    help="Additionally project every scan into a range image (one row per beam) and "
+    "count the labels shown per pixel, the empty pixels and the points that collide "
+    "in a pixel.",
+)
+@click.option(
+    "--distributions",
+    is_flag=True,
+    help="Additionally summarize the range, height and intensity of the points per "
+    "label: quantiles within 0.5% relative error and mean, variance, minimum and "
+    "maximum, and plot them.",
+)
+@click.option("--no-plots", "no_plots", is_flag=True, help="Do not generate any plots.")
+def compute(path, **kwargs):
+    """ Compute the statistics of the dataset at PATH
+
+    PATH is the root directory of the dataset, it contains dataset/sequences. By
+    default all sequences with points and labels are analysed.
+    """
+    analyse(path, mode="compute", **kwargs)
+
+
+@cli.command()
+@click.argument("path", type=click.Path(exists=True))
+@output_options
+def plot(path, **kwargs):
+    """ Plot the statistics of an earlier run
+
+    PATH is the statistics.npz file of an earlier run or a folder in which it (or
+    the csv files with the computed statistics) is located. By default all stored
+    sequences are plotted. Only the graphs are saved to SAVE_DIR, the statistics are
+    left as they are.
+    """
+    analyse(path, mode="from_data", **kwargs)
+
+
+@cli.command()
+@click.argument("paths", nargs=-1, required=True, type=click.Path(exists=True))
+@click.option(
+    "--save_dir",
+    type=click.Path(file_okay=False),
+    required=True,
+    help="Path where to save the merged statistics.",
+)
+@click.option(
+    "--mapping",
+    type=click.Path(exists=True, dir_okay=False),
+    help="semantic-kitti.yaml style file with the learning_map the partial results "
+    "were computed with. If not provided, the built-in mapping is used.",
+)
+@click.option(
+    "--csv",
+    is_flag=True,
+    help="Additionally save every statistic as a csv file in SAVE_DIR.",
+)
+def merge(paths, save_dir, mapping, csv):
+    """ Merge the partial results of compute --shard i/N
+
+    PATHS are the partial result files or folders that contain them. The merged
+    statistics are the same as of a single run and can be plotted with the plot
+    command.
+    """
+    if mapping is not None:
+        load_label_mapping(mapping)
+
+    filenames = [f for path in paths for f in find_partials(path)]
+    try:
+        statistics = merge_partials([load_statistics(f) for f in filenames])
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    filename = save_statistics(save_dir, statistics)
+    if csv:
+        export_csv(save_dir, statistics)
+    print("Merged {n} partial results into {f}".format(n=len(filenames), f=filename))
+
+
+@cli.command()
+@click.argument("path", type=click.Path(exists=True))
+@click.option(
+    "--mapping",
+    type=click.Path(exists=True, dir_okay=False),
+    help="semantic-kitti.yaml style file with the learning_map to compare the "
+    "fingerprint against. If not provided, the built-in mapping is used.",
+)
+def info(path, mapping):
+    """ Print a summary of stored statistics
+
+    PATH is a statistics.npz file, a partial result or a folder that contains the
+    statistics.npz file. Nothing is plotted.
+    """
+    if mapping is not None:
+        load_label_mapping(mapping)
+
+    statistics = load_statistics(path, check_fingerprint=False)
+    for name, value in get_summary(statistics).items():
+        print("{0:<12} {1}".format(name, value))
 
 
 if __name__ == "__main__":
-    analyse()
+    cli()
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""Throughput benchmark of the loading, mapping and statistics hot paths and of the
+startup of the command line interface."""
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import collections
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+import numpy as np
+from data import (
+    distance_bins,
+    get_num_learning_labels,
+    load_data_labels,
+    load_data_points,
+    map_learning,
+)
+from data.synthetic import generate_scan, write_sequence
+from utils import accumulate, create_statistics, iterate_statistics
+from utils.compute import get_counts, get_precision_mismatches
+
+_repo_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def _time(func, items: list) -> float:
+    start = time.perf_counter()
+    for item in items:
+        func(item)
+    return time.perf_counter() - start
+
+
+def run_benchmark(scan_dir: str, num_scans: int, num_points: int) -> dict:
+    """ Time every stage on synthetic scans, returns the seconds per stage """
+    filenames = write_sequence(
+        os.path.join(scan_dir, "00"), num_scans=num_scans, num_points=num_points
+    )
+    points = [load_data_points(p)[0] for p, _ in filenames]
+    semantics = [load_data_labels(f)[0] for _, f in filenames]
+    mapped = [map_learning(s) for s in semantics]
+    depths = [np.linalg.norm(p, 2, axis=1) for p in points]
+
+    def run_sequence(filenames):
+        statistics = create_statistics()
+        for partials in iterate_statistics(filenames):
+            accumulate(statistics, partials)
+
+    timings = collections.OrderedDict()
+    timings["load_data_points"] = _time(load_data_points, [p for p, _ in filenames])
+    timings["load_data_labels"] = _time(load_data_labels, [f for _, f in filenames])
+    timings["map_learning"] = _time(map_learning, semantics)
+    timings["get_counts"] = _time(
+        lambda i: get_counts(
+            depths[i],
+            mapped[i][:, 0],
+            get_num_learning_labels(),
+            np.array(distance_bins),
+        ),
+        range(num_scans),
+    )
+    timings["sequence"] = _time(run_sequence, [filenames])
+    return timings
+
+
+def check_precision(num_scans: int, num_points: int) -> dict:
+    """ Return per axis the points of synthetic scans binned differently in float64
+
+    See get_precision_mismatches, the second count (points not at an edge) must be 0.
+    """
+    rng = np.random.RandomState(0)
+    mismatches = collections.OrderedDict()
+    for _ in range(num_scans):
+        cloud, _ = generate_scan(rng, num_points=num_points)
+        for name, counts in get_precision_mismatches(cloud[:, :3]).items():
+            mismatches[name] = tuple(np.add(mismatches.get(name, (0, 0)), counts))
+    return mismatches
+
+
+def run_startup_benchmark(scan_dir: str, repeats: int) -> dict:
+    """ Time short commands in fresh interpreters, returns the median seconds each
+
+    A single scan run stands for the many short shard jobs of a distributed run, where
+    the startup of the interpreter and of the imports adds up.
+    """
+    write_sequence(
+        os.path.join(scan_dir, "dataset", "sequences", "00"),
+        num_scans=1,
+        num_points=1000,
+    )
+    commands = collections.OrderedDict()
+    commands["interpreter"] = ["-c", "pass"]
+    commands["import utils"] = ["-c", "import utils"]
+    commands["analyse --help"] = ["analyse.py", "--help"]
+    commands["compute 1 scan"] = [
+        "analyse.py",
+        "compute",
+        scan_dir,
+        "--no-plots",
+        "--save_dir",
+        os.path.join(scan_dir, "output"),
+    ]
+
+    timings = collections.OrderedDict()
+    for name, args in commands.items():
+        durations = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            subprocess.run(
+                [sys.executable] + args,
+                cwd=_repo_dir,
+                stdout=subprocess.DEVNULL,
+                check=True,
+            )
+            durations.append(time.perf_counter() - start)
+        timings[name] = float(np.median(durations))
+    return timings
+
+
+def imports_plotting() -> bool:
+    """ Return whether importing analyse.py loads matplotlib """
+    check = "import sys, analyse; sys.exit('matplotlib' in sys.modules)"
+    return subprocess.run([sys.executable, "-c", check], cwd=_repo_dir).returncode != 0
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """ Return the stages whose throughput dropped by more than tolerance """
+    regressions = []
+    for stage, result in results.items():
+        if stage not in baseline:
+            continue
+        ratio = result["scans_per_sec"] / baseline[stage]["scans_per_sec"]
+        if ratio < 1.0 - tolerance:
+            regressions.append((stage, ratio))
+    return regressions
+
+
+def compare_startup(startup: dict, baseline: dict, tolerance: float) -> list:
+    """ Return the commands whose startup time grew by more than tolerance """
+    regressions = []
+    for name, seconds in startup.items():
+        if name not in baseline:
+            continue
+        ratio = seconds / baseline[name]
+        if ratio > 1.0 + tolerance:
+            regressions.append((name, ratio))
+    return regressions
+
+
+@click.command()
+@click.option(
+    "--scans",
+    type=click.IntRange(min=1),
+    default=20,
+    help="Number of synthetic scans per stage.",
+)
+@click.option(
+    "--points",
+    type=click.IntRange(min=1),
+    default=120000,
+    help="Number of points per synthetic scan.",
+)
+@click.option(
+    "--startup_repeats",
+    type=click.IntRange(min=0),
+    default=5,
+    help="Number of runs per command of the startup benchmark. 0 skips it.",
+)
+@click.option(
+    "--baseline",
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON file of an earlier run to compare the throughput against.",
+)
+@click.option(
+    "--tolerance",
+    type=click.FloatRange(min=0.0, max=1.0),
+    default=0.2,
+    help="Relative throughput drop against the baseline that counts as regression.",
+)
+@click.option(
+    "--save_baseline",
+    type=click.Path(dir_okay=False),
+    help="Save the results as JSON file to be used as baseline later.",
+)
+def benchmark(scans, points, startup_repeats, baseline, tolerance, save_baseline):
+    """ Measure scans/sec and points/sec of the hot paths on synthetic scans
+
+    The startup time of short commands is measured as well, and importing analyse.py
+    must not load the plotting stack.
+    """
+    scan_dir = tempfile.mkdtemp(prefix="semantic_kitti_stats_")
+    try:
+        timings = run_benchmark(scan_dir, scans, points)
+        startup = (
+            run_startup_benchmark(scan_dir, startup_repeats) if startup_repeats else {}
+        )
+    finally:
+        shutil.rmtree(scan_dir)
+
+    results = collections.OrderedDict()
+    print("{0:<18} {1:>12} {2:>14}".format("stage", "scans/sec", "points/sec"))
+    for stage, seconds in timings.items():
+        results[stage] = {
+            "seconds": seconds,
+            "scans_per_sec": scans / seconds,
+            "points_per_sec": scans * points / seconds,
+        }
+        print(
+            "{0:<18} {1:>12.1f} {2:>14.3e}".format(
+                stage, scans / seconds, scans * points / seconds
+            )
+        )
+
+    if startup:
+        print("\n{0:<18} {1:>12}".format("command", "seconds"))
+        for name, seconds in startup.items():
+            print("{0:<18} {1:>12.3f}".format(name, seconds))
+
+    mismatches = check_precision(scans, points)
+    print("\n{0:<18} {1:>12} {2:>14}".format("float32 bins", "differ", "not at edge"))
+    for name, (differ, off_edge) in mismatches.items():
+        print("{0:<18} {1:>12d} {2:>14d}".format(name, differ, off_edge))
+
+    failed = imports_plotting()
+    if failed:
+        print("Importing analyse.py loads matplotlib")
+    if any(off_edge > 0 for _, off_edge in mismatches.values()):
+        print("float32 bins differ from float64 away from the bin edges")
+        failed = True
+
+    if save_baseline is not None:
+        with open(save_baseline, "w") as f:
+            json.dump(
+                {
+                    "scans": scans,
+                    "points": points,
+                    "numpy": np.__version__,
+                    "startup": startup,
+                    **results,
+                },
+                f,
+                indent=2,
+            )
+
+    if baseline is not None:
+        with open(baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, tolerance)
+        for stage, ratio in regressions:
+            print(
+                "Regression in {stage}: {p:.0f}% of the baseline throughput".format(
+                    stage=stage, p=100 * ratio
+                )
+            )
+        startup_regressions = compare_startup(
+            startup, baseline.get("startup", {}), tolerance
+        )
+        for name, ratio in startup_regressions:
+            print(
+                "Regression in {name}: {p:.0f}% of the baseline startup time".format(
+                    name=name, p=100 * ratio
+                )
+            )
+        failed = failed or regressions or startup_regressions
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    benchmark()
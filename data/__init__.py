@@ -3,10 +3,35 @@
 __author__ = """Larissa Triess"""
 __email__ = "larissa@triess.eu"
 
+import collections
+import hashlib
+
 import numpy as np
 
-from .loader import load_data_labels, load_data_points
-from .mapping import get_names_learning, get_num_learning_labels, map_learning
+from . import mapping
+from .iterator import (
+    find_sequences,
+    get_scan_filenames,
+    get_shard,
+    iterate_chunks,
+    iterate_scans,
+    load_scan,
+    load_sequence_poses,
+)
+from .loader import (
+    get_num_points,
+    load_calibration,
+    load_data_labels,
+    load_data_points,
+    load_poses,
+)
+from .mapping import (
+    get_names_learning,
+    get_num_learning_labels,
+    is_moving,
+    load_label_mapping,
+    map_learning,
+)
 
 distance_bins = [
     0,
@@ -98,15 +123,111 @@ elevation_bins = [
     1.5037,
     1.8665,
 ]
+height_bins = np.round(np.arange(-3.0, 3.0, 0.25), 2)
+intensity_bins = np.round(np.arange(0.0, 1.0, 0.05), 2)
+instance_size_bins = [1, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+instance_extent_bins = [0.0, 0.5, 1.0, 1.5, 2.0, 3.0, 4.0, 5.0, 7.5, 10.0, 15.0, 20.0]
+track_lifetime_bins = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+track_reappearance_bins = [0, 1, 2, 3, 4, 5, 10, 20]
+track_displacement_bins = [0.0, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 100.0]
+
+# voxel grid around the sensor, edge length and [lower, upper) bounds of x, y and z in m
+voxel_size = 0.2
+voxel_range = [[-51.2, 51.2], [-51.2, 51.2], [-4.0, 2.4]]
+
+# number of columns of the range image, the rows are the beams (elevation_bins)
+range_image_width = 2048
+
+# relative accuracy of the quantile sketches and the magnitudes [min, max] they resolve
+distribution_accuracy = 0.005
+distribution_range = [1e-3, 1e4]
+
+
+# further values the statistics depend on, by name, see register_fingerprint
+_fingerprint_values = collections.OrderedDict()
+
+
+def register_fingerprint(name: str, *values):
+    """ Include values in the fingerprint, e.g. the bins of an axis registered later """
+    _fingerprint_values[name] = values
+
+
+def _update_hash(h, values):
+    # the shape separates the arrays, so different splits of the same numbers differ
+    if isinstance(values, str):
+        values = np.frombuffer(values.encode(), dtype=np.uint8)
+    values = np.asarray(values, dtype=np.float64)
+    h.update(np.asarray([values.ndim] + list(values.shape), np.int64).tobytes())
+    h.update(values.tobytes())
+
+
+def get_fingerprint() -> str:
+    """ Return a hash of the bin definitions and the label mapping in use
+
+    Statistics that were computed with the same fingerprint can be combined. Next to
+    the bins defined here, it covers the values given to register_fingerprint.
+    """
+    h = hashlib.sha1()
+    for values in (
+        distance_bins,
+        azimuth_bins,
+        elevation_bins,
+        height_bins,
+        intensity_bins,
+        instance_size_bins,
+        instance_extent_bins,
+        track_lifetime_bins,
+        track_reappearance_bins,
+        track_displacement_bins,
+        voxel_size,
+        voxel_range,
+        range_image_width,
+        distribution_accuracy,
+        distribution_range,
+        mapping.label_mapping,
+    ):
+        _update_hash(h, values)
+    _update_hash(h, str(mapping.unknown_learning_label))
+    for name in sorted(_fingerprint_values):
+        _update_hash(h, name)
+        for values in _fingerprint_values[name]:
+            _update_hash(h, values)
+    return h.hexdigest()[:16]
 
 
 __all__ = [
     "distance_bins",
     "azimuth_bins",
     "elevation_bins",
+    "height_bins",
+    "intensity_bins",
+    "instance_size_bins",
+    "instance_extent_bins",
+    "track_lifetime_bins",
+    "track_reappearance_bins",
+    "track_displacement_bins",
+    "voxel_size",
+    "voxel_range",
+    "range_image_width",
+    "distribution_accuracy",
+    "distribution_range",
     "load_data_points",
     "load_data_labels",
+    "get_num_points",
     "get_num_learning_labels",
     "get_names_learning",
     "map_learning",
+    "is_moving",
+    "load_label_mapping",
+    "get_fingerprint",
+    "register_fingerprint",
+    "find_sequences",
+    "get_scan_filenames",
+    "get_shard",
+    "iterate_scans",
+    "iterate_chunks",
+    "load_scan",
+    "load_sequence_poses",
+    "load_poses",
+    "load_calibration",
 ]
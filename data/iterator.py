@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import collections
+import concurrent.futures
+import os
+
+import numpy as np
+
+from .loader import (
+    get_num_points,
+    load_calibration,
+    load_data_labels,
+    load_data_points,
+    load_poses,
+)
+
+
+def find_sequences(sequence_folder: str) -> list:
+    """ Return the ids of all sequences in the folder that have points and labels """
+    return sorted(
+        int(name)
+        for name in os.listdir(sequence_folder)
+        if name.isdigit()
+        and os.path.isdir(os.path.join(sequence_folder, name, "velodyne"))
+        and os.path.isdir(os.path.join(sequence_folder, name, "labels"))
+    )
+
+
+def get_scan_filenames(sequence_dir: str) -> list:
+    """ Return the (point file, label file) pairs of all scans of a sequence
+
+    The pairing is validated once for the whole sequence, so the scans can be
+    processed without further checks.
+    """
+    point_dir = os.path.join(sequence_dir, "velodyne")
+    label_dir = os.path.join(sequence_dir, "labels")
+
+    if not os.path.exists(point_dir):
+        raise NotADirectoryError(
+            "Directory for points does not exits: {dir}".format(dir=point_dir)
+        )
+    if not os.path.exists(label_dir):
+        raise NotADirectoryError(
+            "Directory for labels does not exits: {dir}".format(dir=label_dir)
+        )
+
+    point_filenames = sorted(os.listdir(point_dir))
+    label_filenames = sorted(os.listdir(label_dir))
+
+    point_stems = [os.path.splitext(f)[0] for f in point_filenames]
+    label_stems = [os.path.splitext(f)[0] for f in label_filenames]
+    if point_stems != label_stems:
+        for point_file, label_file in zip(point_filenames, label_filenames):
+            if os.path.splitext(point_file)[0] != os.path.splitext(label_file)[0]:
+                raise ValueError(
+                    "Point list file {pf} does not match label file {lf}".format(
+                        pf=os.path.join(point_dir, point_file),
+                        lf=os.path.join(label_dir, label_file),
+                    )
+                )
+        raise ValueError(
+            "Number of point files ({np}) and label files ({nl}) differ in "
+            "{dir}".format(
+                np=len(point_filenames), nl=len(label_filenames), dir=sequence_dir
+            )
+        )
+
+    return [
+        (os.path.join(point_dir, p), os.path.join(label_dir, l))
+        for p, l in zip(point_filenames, label_filenames)
+    ]
+
+
+def load_sequence_poses(sequence_dir: str) -> np.array:
+    """ Return the poses of the scans of a sequence in the frame of the first scan
+
+    The poses in poses.txt are given for the camera. If calib.txt is present, they are
+    transformed into poses of the laser scanner. Returns None without poses.txt.
+    """
+    pose_filename = os.path.join(sequence_dir, "poses.txt")
+    if not os.path.exists(pose_filename):
+        return None
+    poses = load_poses(pose_filename)
+
+    calib_filename = os.path.join(sequence_dir, "calib.txt")
+    if os.path.exists(calib_filename):
+        velo_to_cam = load_calibration(calib_filename).get("Tr", np.eye(4))
+        poses = np.linalg.inv(velo_to_cam) @ poses @ velo_to_cam
+    return poses
+
+
+def get_shard(filenames: list, shard: int, num_shards: int) -> list:
+    """ Return the contiguous part of the scans that belongs to shard of num_shards """
+    start = len(filenames) * shard // num_shards
+    stop = len(filenames) * (shard + 1) // num_shards
+    return filenames[start:stop]
+
+
+def load_scan(filenames: (str, str), mmap: bool = False) -> tuple:
+    """ Load the points (coordinates, intensity) and labels (semantics, instance) """
+    point_filename, label_filename = filenames
+    return (
+        load_data_points(point_filename, mmap=mmap),
+        load_data_labels(label_filename, mmap=mmap),
+    )
+
+
+def iterate_scans(
+    filenames: list, prefetch: int = 4, threads: int = 2, mmap: bool = False
+):
+    """ Yield the (points, labels) of all scans in order
+
+    Up to prefetch scans are read ahead by a pool of I/O threads, so reading the next
+    scans overlaps with the processing of the current one.
+    """
+    if prefetch <= 0:
+        for f in filenames:
+            yield load_scan(f, mmap=mmap)
+        return
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        queue = collections.deque()
+        remaining = collections.deque(filenames)
+        try:
+            while remaining and len(queue) < prefetch:
+                queue.append(executor.submit(load_scan, remaining.popleft(), mmap))
+            while queue:
+                scan = queue.popleft().result()
+                if remaining:
+                    queue.append(executor.submit(load_scan, remaining.popleft(), mmap))
+                yield scan
+        finally:
+            # do not read ahead any further if the consumer stops early
+            for future in queue:
+                future.cancel()
+
+
+def iterate_chunks(
+    filenames: (str, str), chunk_size: int = 2 ** 20, mmap: bool = False
+):
+    """ Yield the (points, labels) of a point and label file in chunks of points
+
+    At most chunk_size points are in memory at once, so files of any size (e.g. many
+    concatenated scans) can be processed. The chunks have the same layout as a scan.
+    """
+    num_points = get_num_points(filenames)
+    point_filename, label_filename = filenames
+
+    if mmap:
+        (sensor, intensity), (semantics, instance) = load_scan(filenames, mmap=True)
+        for start in range(0, num_points, chunk_size):
+            stop = start + chunk_size
+            yield (
+                (sensor[start:stop], intensity[start:stop]),
+                (semantics[start:stop], instance[start:stop]),
+            )
+        return
+
+    with open(point_filename, "rb") as point_file:
+        with open(label_filename, "rb") as label_file:
+            for start in range(0, num_points, chunk_size):
+                count = min(chunk_size, num_points - start)
+                cloud = np.fromfile(point_file, dtype=np.float32, count=4 * count)
+                cloud = cloud.reshape((-1, 4))
+                labels = np.fromfile(label_file, dtype=np.uint32, count=count)
+                labels = labels.reshape((-1, 1))
+                yield (
+                    (cloud[:, :-1], cloud[:, -1][:, np.newaxis]),
+                    (labels & 0xFFFF, labels >> 16),
+                )
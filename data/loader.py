@@ -3,14 +3,80 @@
 __author__ = """Larissa Triess"""
 __email__ = "larissa@triess.eu"
 
+import os
+
 import numpy as np
 
+# record layout of the .bin (x, y, z, intensity) and .label (semantic, instance) files
+point_dtype = np.dtype([("xyz", "<f4", (3,)), ("intensity", "<f4")])
+label_dtype = np.dtype([("semantics", "<u2"), ("instance", "<u2")])
+
+
+def get_num_points(filenames: (str, str)) -> int:
+    """ Return the number of points of a point and label file, checking both match """
+    point_filename, label_filename = filenames
+    num_points = os.path.getsize(point_filename) // point_dtype.itemsize
+    num_labels = os.path.getsize(label_filename) // label_dtype.itemsize
+    if num_points != num_labels:
+        raise ValueError(
+            "Point file {pf} holds {np} points but label file {lf} {nl} labels".format(
+                pf=point_filename, np=num_points, lf=label_filename, nl=num_labels
+            )
+        )
+    return num_points
+
+
+def _memmap(path: str, dtype: np.dtype) -> np.array:
+    # mmap does not support empty files
+    if os.path.getsize(path) == 0:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+def load_data_points(path: str, mmap: bool = False) -> (np.array, np.array):
+    """ Load the coordinates and the intensity of a scan
+
+    With mmap, the file is memory-mapped and both are read-only views on the file,
+    i.e. no data is copied and only the pages that are actually accessed are read.
+    """
+    if mmap:
+        cloud = _memmap(path, point_dtype)
+        return cloud["xyz"], cloud["intensity"][:, np.newaxis]
 
-def load_data_points(path: str) -> (np.array, np.array):
     cloud = np.fromfile(path, dtype=np.float32).reshape((-1, 4))
     return cloud[:, :-1], cloud[:, -1][:, np.newaxis]
 
 
-def load_data_labels(path: str) -> (np.array, np.array):
+def load_data_labels(path: str, mmap: bool = False) -> (np.array, np.array):
+    """ Load the semantic and the instance labels of a scan
+
+    With mmap, the file is memory-mapped and both are read-only views on the lower and
+    upper 16 bit of the labels, so the split is only done when the data is accessed.
+    """
+    if mmap:
+        labels = _memmap(path, label_dtype)
+        return labels["semantics"][:, np.newaxis], labels["instance"][:, np.newaxis]
+
     labels = np.fromfile(path, dtype=np.uint32).reshape((-1, 1))
     return labels & 0xFFFF, labels >> 16
+
+
+def load_poses(path: str) -> np.array:
+    """ Load the poses of a sequence (poses.txt) as homogeneous 4x4 matrices """
+    poses = np.loadtxt(path, dtype=np.float64, ndmin=2).reshape((-1, 3, 4))
+    bottom = np.tile([[[0.0, 0.0, 0.0, 1.0]]], (poses.shape[0], 1, 1))
+    return np.concatenate([poses, bottom], axis=1)
+
+
+def load_calibration(path: str) -> dict:
+    """ Load the calibration of a sequence (calib.txt) as homogeneous 4x4 matrices """
+    calibration = {}
+    with open(path, "r") as f:
+        for line in f:
+            name, _, values = line.partition(":")
+            if not values.strip():
+                continue
+            matrix = np.eye(4)
+            matrix[:3, :] = np.array(values.split(), dtype=np.float64).reshape((3, 4))
+            calibration[name.strip()] = matrix
+    return calibration
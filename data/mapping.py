@@ -79,6 +79,71 @@ label_mapping = [
 ]
 
 
+# dense lookup table raw label id -> learning label id, built on first use
+_learning_lut = None
+
+# raw labels of moving objects, map_learning maps them to the label of their class
+moving_labels = [252, 253, 254, 255, 256, 257, 258, 259]
+
+# learning label for raw label ids that are not part of the mapping
+unknown_learning_label = 0
+
+
+def set_label_mapping(mapping: list, names: list = None):
+    """ Replace the raw to learning label mapping (and optionally the label names)
+
+    Both lists are modified in place, so references imported from this module stay
+    valid. The lookup table is rebuilt on the next call of map_learning.
+    """
+    global _learning_lut
+    label_mapping[:] = [[int(o), int(n)] for o, n in mapping]
+    if names is not None:
+        label_names[:] = [[int(i), str(n)] for i, n in names]
+    _learning_lut = None
+
+
+def load_label_mapping(path: str):
+    """ Load the label mapping from a semantic-kitti.yaml style config file
+
+    The file must contain a learning_map (raw id -> learning id). The label names are
+    taken from the labels entry if present.
+    """
+    try:
+        import yaml
+    except ImportError:
+        raise ImportError("Loading a mapping file requires PyYAML (pip install pyyaml)")
+
+    with open(path, "r") as f:
+        config = yaml.safe_load(f)
+
+    if "learning_map" not in config:
+        raise ValueError("No learning_map found in {path}".format(path=path))
+
+    raw_ids = sorted(int(i) for i in config["learning_map"])
+    learning_map = {int(k): int(v) for k, v in config["learning_map"].items()}
+    names = {int(k): v for k, v in config.get("labels", {}).items()}
+
+    set_label_mapping(
+        [[i, learning_map[i]] for i in raw_ids],
+        [[i, names.get(i, str(i))] for i in raw_ids],
+    )
+
+
+def get_learning_lut() -> np.array:
+    """ Return the lookup table raw label id -> learning label id
+
+    The table covers all raw ids of the mapping plus one trailing entry that holds the
+    learning label for unknown ids, so indexing with mode="clip" is always safe.
+    """
+    global _learning_lut
+    if _learning_lut is None:
+        mapping = np.array(label_mapping)
+        lut = np.full(np.max(mapping[:, 0]) + 2, unknown_learning_label, np.uint32)
+        lut[mapping[:, 0]] = mapping[:, 1]
+        _learning_lut = lut
+    return _learning_lut
+
+
 def get_num_learning_labels() -> int:
     return len(np.unique(np.array(label_mapping)[:, 1]))
 
@@ -94,10 +159,13 @@ def get_names_learning() -> (np.array, np.array, np.array):
 
 
 def map_learning(labels: np.array) -> np.array:
-    old = np.array(label_mapping)[:, 0]
-    new = np.array(label_mapping)[:, 1]
+    """ Map raw label ids to learning label ids with a single table lookup
+
+    Raw ids that are not part of the mapping are mapped to unknown_learning_label.
+    """
+    return np.take(get_learning_lut(), labels, mode="clip")
+
 
-    output = np.copy(labels)
-    for o, n in zip(old, new):
-        output[labels == o] = n
-    return output
+def is_moving(labels: np.array) -> np.array:
+    """ Return whether the raw label ids are moving objects """
+    return np.logical_and(labels >= moving_labels[0], labels <= moving_labels[-1])
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import os
+
+import numpy as np
+
+from . import elevation_bins
+
+# rough share of the points per raw label in Semantic KITTI
+ground_label_mix = [
+    [40, 0.45],
+    [48, 0.25],
+    [72, 0.2],
+    [44, 0.06],
+    [49, 0.02],
+    [60, 0.02],
+]
+object_label_mix = [
+    [70, 0.42],
+    [50, 0.24],
+    [10, 0.1],
+    [51, 0.08],
+    [0, 0.06],
+    [71, 0.03],
+    [80, 0.02],
+    [52, 0.01],
+    [1, 0.005],
+    [99, 0.005],
+    [81, 0.004],
+    [20, 0.003],
+    [18, 0.002],
+    [30, 0.002],
+    [252, 0.002],
+    [11, 0.001],
+    [15, 0.001],
+    [31, 0.001],
+    [13, 0.001],
+    [254, 0.001],
+]
+thing_labels = [10, 11, 13, 15, 18, 20, 30, 31, 32, 252, 253, 254, 255, 257, 258, 259]
+
+sensor_height = 1.73
+
+
+def generate_scan(
+    rng: np.random.RandomState, num_points: int = 120000, num_beams: int = 64
+) -> (np.array, np.array):
+    """ Generate a synthetic scan that resembles an HDL-64E scan of Semantic KITTI
+
+    Returns the points (x, y, z, intensity) as float32 and the labels (instance << 16 |
+    semantic) as uint32, in the layout of the .bin and .label files.
+    """
+    beams = np.asarray(elevation_bins)[-num_beams:]
+    elevation = np.deg2rad(beams[rng.randint(0, num_beams, num_points)])
+    elevation += rng.normal(0, 0.001, num_points)
+    azimuth = rng.uniform(-np.pi, np.pi, num_points)
+
+    # steep beams hit the ground plane, the others hit objects around the car
+    distance = rng.uniform(2.0, 80.0, num_points) * rng.uniform(0.3, 1.0, num_points)
+    ground = np.logical_and(
+        elevation < np.deg2rad(-4.0), rng.uniform(size=num_points) < 0.8
+    )
+    distance[ground] = sensor_height / np.sin(-elevation[ground])
+    distance += rng.normal(0, 0.02, num_points)
+
+    points = np.empty([num_points, 4], dtype=np.float32)
+    points[:, 0] = distance * np.cos(elevation) * np.cos(azimuth)
+    points[:, 1] = distance * np.cos(elevation) * np.sin(azimuth)
+    points[:, 2] = distance * np.sin(elevation)
+    points[:, 3] = rng.beta(2.0, 5.0, num_points)
+
+    semantics = np.empty(num_points, dtype=np.uint32)
+    for mask, mix in [(ground, ground_label_mix), (~ground, object_label_mix)]:
+        ids, p = np.array(mix, dtype=np.float64).T
+        semantics[mask] = ids[rng.choice(len(ids), np.sum(mask), p=p / np.sum(p))]
+
+    instance = rng.randint(1, 20, num_points).astype(np.uint32)
+    instance[~np.isin(semantics, thing_labels)] = 0
+
+    return points, np.left_shift(instance, 16) | semantics
+
+
+def write_sequence(
+    sequence_dir: str, num_scans: int, num_points: int = 120000, seed: int = 0
+) -> list:
+    """ Write synthetic scans in the folder structure of a Semantic KITTI sequence
+
+    Returns the (point file, label file) pairs of the written scans.
+    """
+    rng = np.random.RandomState(seed)
+    point_dir = os.path.join(sequence_dir, "velodyne")
+    label_dir = os.path.join(sequence_dir, "labels")
+    for d in [point_dir, label_dir]:
+        if not os.path.exists(d):
+            os.makedirs(d)
+
+    filenames = []
+    for i in range(num_scans):
+        points, labels = generate_scan(rng, num_points=num_points)
+        point_filename = os.path.join(point_dir, "{0:06d}.bin".format(i))
+        label_filename = os.path.join(label_dir, "{0:06d}.label".format(i))
+        points.tofile(point_filename)
+        labels.tofile(label_filename)
+        filenames.append((point_filename, label_filename))
+    return filenames
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+
+import os
+import sys
+
+import pytest
+
+# the packages data and utils live in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def dataset(tmp_path_factory) -> str:
+    """ Small synthetic dataset with two sequences in the Semantic KITTI layout """
+    from data.synthetic import write_sequence
+
+    path = tmp_path_factory.mktemp("dataset")
+    for sequence in [0, 1]:
+        write_sequence(
+            str(path / "dataset" / "sequences" / "{0:02d}".format(sequence)),
+            num_scans=7,
+            num_points=3000,
+            seed=sequence,
+        )
+    return str(path)
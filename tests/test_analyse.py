@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+from utils import find_partials, get_axis_key, load_statistics, merge_partials
+
+from analyse import cli
+
+
+def _run(*args):
+    result = CliRunner().invoke(cli, [str(a) for a in args])
+    assert result.exit_code == 0, result.output
+    return result
+
+
+def _load(save_dir):
+    with np.load(os.path.join(str(save_dir), "statistics.npz")) as content:
+        return {key: content[key] for key in content.files}
+
+
+def _assert_same_statistics(a, b, keys=None):
+    for key in a if keys is None else keys:
+        np.testing.assert_array_equal(a[key], b[key], err_msg=key)
+
+
+@pytest.fixture(scope="module")
+def single_run(dataset, tmp_path_factory):
+    save_dir = tmp_path_factory.mktemp("single")
+    _run("compute", dataset, "--no-plots", "--save_dir", save_dir)
+    return _load(save_dir)
+
+
+@pytest.fixture(scope="module")
+def partial_dir(dataset, tmp_path_factory):
+    save_dir = tmp_path_factory.mktemp("partials")
+    for shard in range(3):
+        _run("compute", dataset, "--save_dir", save_dir, "--shard", "%d/3" % shard)
+    return str(save_dir)
+
+
+def test_merged_shards_match_single_run(single_run, partial_dir, tmp_path):
+    _run("merge", partial_dir, "--save_dir", tmp_path)
+    merged = _load(tmp_path)
+    assert set(merged) == set(single_run)
+    _assert_same_statistics(single_run, merged)
+
+
+def test_merge_rejects_gaps_and_overlaps(partial_dir):
+    partials = [load_statistics(f) for f in find_partials(partial_dir)]
+
+    with pytest.raises(ValueError, match="not covered"):
+        merge_partials(partials[:2])
+    with pytest.raises(ValueError, match="given twice"):
+        merge_partials(partials + partials[:1])
+
+    overlapping = dict(partials[1])
+    overlapping["scans"] = np.append(partials[1]["scans"], partials[0]["scans"][0])
+    with pytest.raises(ValueError, match="covered by several shards"):
+        merge_partials([partials[0], overlapping, partials[2]])
+
+
+def test_workers_match_serial_run(dataset, single_run, tmp_path):
+    _run("compute", dataset, "--no-plots", "--save_dir", tmp_path, "--workers", 2)
+    _assert_same_statistics(single_run, _load(tmp_path))
+
+
+def test_joint_marginals_match_label_matrices(dataset, single_run, tmp_path):
+    _run("compute", dataset, "--no-plots", "--save_dir", tmp_path, "--joint")
+    joint = _load(tmp_path)
+    keys = [
+        key
+        for key in single_run
+        if key.endswith(get_axis_key(""))
+        or key.endswith("points_per_label")
+        or key.endswith("points_per_distance")
+    ]
+    assert len(keys) > 0
+    _assert_same_statistics(single_run, joint, keys)
+
+
+def test_plot_reports_a_fingerprint_mismatch(single_run, tmp_path):
+    np.savez(str(tmp_path / "statistics.npz"), **dict(single_run, fingerprint="other"))
+    result = CliRunner().invoke(cli, ["plot", str(tmp_path)])
+    assert result.exit_code == 1
+    assert "different bins or label mapping" in result.output
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from utils import compute_cached, create_statistics
+from utils.cache import load_cached, save_cached
+
+
+def _write_scan(tmp_path):
+    filenames = (str(tmp_path / "000000.bin"), str(tmp_path / "000000.label"))
+    np.zeros((4, 4), np.float32).tofile(filenames[0])
+    np.zeros(4, np.uint32).tofile(filenames[1])
+    return filenames
+
+
+def test_cached_joint_histogram_of_other_axes_is_outdated(tmp_path):
+    filenames = _write_scan(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    save_cached(cache_dir, filenames, create_statistics(joint=True))
+
+    expected = create_statistics(joint=True)
+    assert load_cached(cache_dir, filenames, list(expected), expected) is not None
+
+    expected = create_statistics(("height",), joint=True)
+    assert load_cached(cache_dir, filenames, list(expected), expected) is None
+
+
+def test_compute_cached_recomputes_other_axes(tmp_path):
+    filenames = _write_scan(tmp_path)
+    cache_dir = str(tmp_path / "cache")
+    calls = []
+
+    def compute(axes):
+        def func(_):
+            calls.append(axes)
+            return create_statistics(axes, joint=True)
+
+        expected = create_statistics(axes, joint=True)
+        return compute_cached(
+            filenames, func, cache_dir, keys=list(expected), expected=expected
+        )
+
+    compute(())
+    compute(())
+    partials = compute(("height",))
+    assert calls == [(), ("height",)]
+    assert partials["joint_histogram"].shape == (
+        create_statistics(("height",), joint=True)["joint_histogram"].shape
+    )
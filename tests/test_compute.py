@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+from utils.axes import ScanQuantities, get_bins, get_num_bins
+from utils.compute import (
+    get_bin_indices,
+    get_counts,
+    get_grouped_counts,
+    get_precision_mismatches,
+)
+from utils.grouping import LabelGroups
+
+BINS = np.array([0.0, 5.0, 10.0, 20.0])
+NUM_LABELS = 3
+
+
+def _get_reference_counts(data, labels, num_labels, bins, lower=False):
+    # the loop over labels and bins that get_counts replaces
+    edges = np.concatenate([[-np.inf], bins, [np.inf]])
+    offset = 0 if lower else 1
+    counter = np.zeros([num_labels, bins.shape[0] + (1 if lower else 0)], np.int64)
+    for label in range(num_labels):
+        values = data[labels == label]
+        for b in range(counter.shape[1]):
+            bin_min, bin_max = edges[b + offset], edges[b + offset + 1]
+            counter[label, b] = np.sum(
+                np.logical_and(values >= bin_min, values < bin_max)
+            )
+    return counter
+
+
+def _get_data():
+    special = np.concatenate(
+        [BINS, BINS - 1e-9, [-1.0, 100.0, np.nan, np.inf, -np.inf]]
+    )
+    random = np.random.RandomState(0).uniform(-5, 30, 1000)
+    data = np.concatenate([special, special, random])
+    # labels >= NUM_LABELS are not counted
+    labels = np.random.RandomState(1).randint(0, NUM_LABELS + 2, data.shape[0])
+    return data, labels
+
+
+@pytest.mark.parametrize("lower", [False, True])
+def test_get_counts_matches_loop(lower):
+    data, labels = _get_data()
+    np.testing.assert_array_equal(
+        get_counts(data, labels, NUM_LABELS, BINS, lower=lower),
+        _get_reference_counts(data, labels, NUM_LABELS, BINS, lower=lower),
+    )
+
+
+@pytest.mark.parametrize("lower", [False, True])
+def test_get_grouped_counts_matches_loop(lower):
+    data, labels = _get_data()
+    groups = LabelGroups(labels, NUM_LABELS)
+    np.testing.assert_array_equal(
+        get_grouped_counts(groups.sort(data), groups, BINS, lower=lower),
+        _get_reference_counts(data, labels, NUM_LABELS, BINS, lower=lower),
+    )
+
+
+def test_azimuth_just_below_360_degree_stays_in_last_bin():
+    coordinates = np.array([[50, -5e-6, 0], [20, -1e-6, 1]], np.float32)
+    azimuth = ScanQuantities(coordinates)["azimuth"]
+    indices, valid = get_bin_indices(azimuth, get_bins("azimuth", azimuth.dtype))
+    np.testing.assert_array_equal(indices, get_num_bins("azimuth") - 1)
+    assert np.all(valid)
+    assert get_precision_mismatches(coordinates)["azimuth"] == (0, 0)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from utils import SemanticKittiStats, compute_statistics
+
+
+def _get_scan(num_points, labels):
+    points = np.random.RandomState(0).uniform(-20, 20, (num_points, 4))
+    return points.astype(np.float32), np.full(num_points, labels, np.uint32)
+
+
+def test_scan_without_instances():
+    stats = SemanticKittiStats(instances=True)
+    stats.update(*_get_scan(100, 40))  # road only, no instance ids
+    stats.update(*_get_scan(0, 0))  # empty scan
+    statistics = stats.result()
+    assert stats.num_scans == 2
+    assert np.sum(statistics["instances_per_label"]) == 0
+    assert np.sum(statistics["instance_points_label_matrix"]) == 0
+
+
+def test_scan_with_instances():
+    stats = SemanticKittiStats(instances=True)
+    stats.update(*_get_scan(100, 10 | 7 << 16))  # a single car
+    assert np.sum(stats.result()["instances_per_label"]) == 1
+
+
+def test_track_statistics_of_empty_scan():
+    points, labels = _get_scan(0, 0)
+    partials = compute_statistics(
+        points[:, :3],
+        labels.reshape((-1, 1)),
+        points[:, 3:],
+        labels.reshape((-1, 1)) >> 16,
+        tracks=True,
+    )
+    assert partials["track_keys"].shape == (0,)
+    assert partials["track_centers"].shape == (0, 3)
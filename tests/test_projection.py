@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from data import elevation_bins
+from utils import (
+    ScanQuantities,
+    SemanticKittiStats,
+    get_pixel_indices,
+    get_range_image_shape,
+)
+
+
+def test_empty_scan_counts_as_empty_range_image():
+    stats = SemanticKittiStats(range_image=True)
+    stats.update(np.zeros((0, 4), np.float32), np.zeros(0, np.uint32))
+    statistics = stats.result()
+    assert statistics["range_image_scans"][0] == 1
+    assert statistics["range_image_label_histogram"].nnz == 0
+    assert statistics["range_image_collision_histogram"].nnz == 0
+
+
+def test_every_beam_is_projected_into_its_row():
+    inclination = np.deg2rad(elevation_bins)
+    x, z = 10 * np.cos(inclination), 10 * np.sin(inclination)
+    coordinates = np.stack([x, np.zeros_like(x), z], axis=1).astype(np.float32)
+    rows, cols = get_range_image_shape()
+    pixels = get_pixel_indices(ScanQuantities(coordinates))
+    np.testing.assert_array_equal(pixels // cols, np.arange(rows)[::-1])
+    np.testing.assert_array_equal(pixels % cols, 0)
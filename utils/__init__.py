@@ -3,14 +3,152 @@
 __author__ = """Larissa Triess"""
 __email__ = "larissa@triess.eu"
 
+from .accumulator import SemanticKittiStats
+from .axes import (
+    ScanQuantities,
+    axis_registry,
+    default_axes,
+    get_axis_key,
+    register_axis,
+    register_quantity,
+)
+from .cache import compute_cached, get_cache_dir
+from .compute import get_axis_statistics, get_joint_statistics
 from .compute import (
     get_points_over_angles_and_label_statistics as get_angle_label_stats,
 )
 from .compute import (
     get_points_over_distance_and_label_statistics as get_distance_label_stats,
 )
+from .distributions import (
+    distribution_quantities,
+    get_distribution_statistics,
+    get_quantiles,
+    get_sketch_bins,
+    get_sketch_values,
+)
+from .instances import get_instance_statistics, get_instances, instance_statistics
+from .moments import Moments
+from .pipeline import (
+    accumulate,
+    complete_statistics,
+    compute_chunked_statistics,
+    compute_scan_statistics,
+    compute_statistics,
+    create_pool,
+    create_statistics,
+    get_axes,
+    iterate_statistics,
+    map_scans,
+    profile_scan,
+)
+from .profiling import format_summary, profile_key, profiler, write_trace
+from .projection import (
+    get_collision_rate,
+    get_empty_pixel_rate,
+    get_pixel_indices,
+    get_range_image_shape,
+    get_range_image_statistics,
+)
+from .render import PlotRenderer
+from .sampling import (
+    accumulate_squares,
+    create_squares,
+    estimate_statistics,
+    get_relative_error,
+    get_total_intervals,
+    sample_scans,
+)
+from .sparse import SparseHistogram
+from .store import (
+    export_csv,
+    find_partials,
+    get_sequence_key,
+    get_sequence_statistics,
+    get_stored_axes,
+    get_stored_sequences,
+    get_summary,
+    get_total_statistics,
+    interval_suffix,
+    load_statistics,
+    merge_partials,
+    save_partial,
+    save_statistics,
+    sequence_statistics,
+    total_statistics,
+)
+from .tracks import TrackState, frame_statistics
+from .voxels import get_bev_heatmaps, get_voxel_shape, get_voxel_statistics
 
 __all__ = [
+    "SemanticKittiStats",
     "get_distance_label_stats",
     "get_angle_label_stats",
+    "compute_statistics",
+    "compute_scan_statistics",
+    "compute_chunked_statistics",
+    "iterate_statistics",
+    "create_pool",
+    "map_scans",
+    "accumulate",
+    "compute_cached",
+    "get_cache_dir",
+    "save_statistics",
+    "load_statistics",
+    "export_csv",
+    "save_partial",
+    "find_partials",
+    "merge_partials",
+    "get_total_statistics",
+    "get_sequence_key",
+    "sequence_statistics",
+    "total_statistics",
+    "get_sequence_statistics",
+    "get_stored_axes",
+    "get_stored_sequences",
+    "get_summary",
+    "ScanQuantities",
+    "axis_registry",
+    "default_axes",
+    "get_axis_key",
+    "register_axis",
+    "register_quantity",
+    "get_axis_statistics",
+    "create_statistics",
+    "get_axes",
+    "complete_statistics",
+    "get_joint_statistics",
+    "SparseHistogram",
+    "get_instances",
+    "get_instance_statistics",
+    "instance_statistics",
+    "TrackState",
+    "frame_statistics",
+    "get_voxel_shape",
+    "get_voxel_statistics",
+    "get_bev_heatmaps",
+    "get_range_image_shape",
+    "get_pixel_indices",
+    "get_range_image_statistics",
+    "get_empty_pixel_rate",
+    "get_collision_rate",
+    "distribution_quantities",
+    "get_distribution_statistics",
+    "get_sketch_bins",
+    "get_sketch_values",
+    "get_quantiles",
+    "Moments",
+    "sample_scans",
+    "create_squares",
+    "accumulate_squares",
+    "estimate_statistics",
+    "get_total_intervals",
+    "get_relative_error",
+    "interval_suffix",
+    "profiler",
+    "profile_key",
+    "profile_scan",
+    "format_summary",
+    "write_trace",
+    "PlotRenderer",
 ]
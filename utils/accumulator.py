@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import collections
+
+import numpy as np
+from data import get_fingerprint
+
+from .axes import default_axes
+from .pipeline import (
+    accumulate,
+    complete_statistics,
+    compute_statistics,
+    create_statistics,
+    get_axes,
+)
+from .sparse import SparseHistogram, pack_statistics, unpack_statistics
+
+
+def _copy(value):
+    if isinstance(value, SparseHistogram):
+        return SparseHistogram(value.shape, value.keys.copy(), value.counts.copy())
+    return value.copy()
+
+
+class SemanticKittiStats(object):
+    """ Accumulates the statistics of scans that are already in memory
+
+    Meant to be fed as a side effect of an existing pass over the data, e.g. in the
+    workers of a training data loader. The state is allocated once and summed in place,
+    accumulators of different workers are combined with merge and can be pickled to
+    send them between processes. The options are those of create_statistics, track
+    statistics need all scans of a sequence in order and are not supported.
+    """
+
+    __slots__ = (
+        "axes",
+        "joint",
+        "instances",
+        "voxels",
+        "range_image",
+        "distributions",
+        "num_scans",
+        "_fingerprint",
+        "_statistics",
+    )
+
+    def __init__(
+        self,
+        axes: tuple = default_axes,
+        joint: bool = False,
+        instances: bool = False,
+        voxels: bool = False,
+        range_image: bool = False,
+        distributions: bool = False,
+    ):
+        self.axes = get_axes(axes)
+        self.joint = joint
+        self.instances = instances
+        self.voxels = voxels
+        self.range_image = range_image
+        self.distributions = distributions
+        self.num_scans = 0
+        self._fingerprint = get_fingerprint()
+        self._statistics = create_statistics(
+            self.axes,
+            joint=joint,
+            instances=instances,
+            voxels=voxels,
+            range_image=range_image,
+            distributions=distributions,
+        )
+
+    def update(self, points: np.array, labels: np.array) -> "SemanticKittiStats":
+        """ Add a scan
+
+        points are the N x 4 (x, y, z, remission) or N x 3 coordinates of a scan and
+        labels its N raw labels as stored in the label files, the semantic label in the
+        lower and the instance id in the upper 16 bits.
+        """
+        points = np.asarray(points)
+        labels = np.asarray(labels).reshape((-1, 1))
+        if points.shape[0] != labels.shape[0]:
+            raise ValueError(
+                "Got {p} points but {l} labels".format(
+                    p=points.shape[0], l=labels.shape[0]
+                )
+            )
+
+        partials = compute_statistics(
+            points[:, :3],
+            labels & 0xFFFF,
+            points[:, 3:4] if points.shape[1] > 3 else None,
+            labels >> 16,
+            axes=self.axes,
+            joint=self.joint,
+            instances=self.instances,
+            voxels=self.voxels,
+            range_image=self.range_image,
+            distributions=self.distributions,
+        )
+        accumulate(self._statistics, partials)
+        self.num_scans += 1
+        return self
+
+    def merge(self, other: "SemanticKittiStats") -> "SemanticKittiStats":
+        """ Add the statistics of another accumulator with the same options in place """
+        if self._get_options() != other._get_options():
+            raise ValueError("Cannot merge statistics computed with different options")
+        if self._fingerprint != other._fingerprint:
+            raise ValueError(
+                "Cannot merge statistics computed with different bins or label mapping"
+            )
+        accumulate(self._statistics, other._statistics)
+        self.num_scans += other.num_scans
+        return self
+
+    def __iadd__(self, other: "SemanticKittiStats") -> "SemanticKittiStats":
+        return self.merge(other)
+
+    def result(self) -> dict:
+        """ Return a copy of the statistics of all scans added so far
+
+        The statistics have the same names as those of a sequence in the result store,
+        with joint, the label matrices are derived from the joint histogram.
+        """
+        statistics = collections.OrderedDict(
+            (key, _copy(value)) for key, value in self._statistics.items()
+        )
+        return complete_statistics(statistics, self.axes)
+
+    def _get_options(self) -> tuple:
+        return (
+            self.axes,
+            self.joint,
+            self.instances,
+            self.voxels,
+            self.range_image,
+            self.distributions,
+        )
+
+    def __getstate__(self):
+        state = {name: getattr(self, name) for name in self.__slots__}
+        state["_statistics"] = pack_statistics(self._statistics)
+        return state
+
+    def __setstate__(self, state):
+        for name in self.__slots__:
+            setattr(self, name, state[name])
+        self._statistics = collections.OrderedDict(
+            unpack_statistics(state["_statistics"])
+        )
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import collections
+
+import numpy as np
+from data import (
+    azimuth_bins,
+    distance_bins,
+    elevation_bins,
+    height_bins,
+    instance_size_bins,
+    intensity_bins,
+    register_fingerprint,
+)
+
+from .buffers import get_buffer
+
+# quantity: name of the per-point quantity that is binned
+# bins: lower bin edges in the unit of the quantity
+# lower: add an underflow bin for values below the first edge
+# edges: bin edges for plotting, label: axis label for plotting
+Axis = collections.namedtuple("Axis", ["quantity", "bins", "lower", "edges", "label"])
+
+# per-point quantities, computed from the quantities of a scan on demand
+quantity_functions = {}
+
+# histogram axes, each one yields a label x bin matrix per scan
+axis_registry = collections.OrderedDict()
+
+# bins of the axes in the precision of the quantities, see get_bins
+_typed_bins = {}
+
+# the axes that are always computed
+default_axes = ("distance", "azimuth", "elevation")
+
+
+def register_quantity(name: str, func):
+    """ Register a per-point quantity, func gets the ScanQuantities of the scan """
+    quantity_functions[name] = func
+
+
+def register_axis(
+    name: str,
+    quantity: str,
+    bins: np.array,
+    lower: bool = False,
+    edges: np.array = None,
+    label: str = None,
+):
+    """ Register a histogram axis over a per-point quantity
+
+    The bins are part of the fingerprint, so statistics computed with different bins
+    of an axis are not combined.
+    """
+    for key in [k for k in _typed_bins if k[0] == name]:
+        del _typed_bins[key]
+    axis_registry[name] = Axis(
+        quantity=quantity,
+        bins=np.asarray(bins),
+        lower=lower,
+        edges=np.asarray(bins) if edges is None else np.asarray(edges),
+        label=name if label is None else label,
+    )
+    register_fingerprint("axis_" + name, quantity, bins, [lower])
+
+
+def get_axis_key(name: str) -> str:
+    """ Return the name under which the label x axis matrix is stored """
+    return "{name}_label_matrix".format(name=name)
+
+
+def get_bins(name: str, dtype: np.dtype) -> np.array:
+    """ Return the bins of an axis in the precision of the quantity, computed once
+
+    Comparing float32 quantities against float64 bins would convert every scan to
+    float64 first. In float32, only values within rounding of an edge can change bins.
+    """
+    key = (name, np.dtype(dtype))
+    if key not in _typed_bins:
+        bins = axis_registry[name].bins
+        if np.issubdtype(key[1], np.floating):
+            bins = bins.astype(key[1])
+        _typed_bins[key] = bins
+    return _typed_bins[key]
+
+
+def get_num_bins(name: str) -> int:
+    axis = axis_registry[name]
+    return axis.bins.shape[0] + (1 if axis.lower else 0)
+
+
+class ScanQuantities(object):
+    """ Per-point quantities of a scan, each one is computed at most once
+
+    Derived quantities (e.g. the range) are shared by all axes that need them. They are
+    computed in the precision of the coordinates (float32 for the scan files) into
+    buffers that are reused for the next scan, see get_buffer, so they are only valid
+    until the quantities of the next scan are computed.
+
+    If the points are sorted by label, groups are their LabelGroups. The coordinates
+    and semantics are then given sorted, intensity and instance in the order of the
+    scan. They are only sorted when they are used, so scans whose statistics do not
+    read them neither sort nor (memory-mapped) load them.
+    """
+
+    def __init__(
+        self,
+        coordinates: np.array,
+        intensity: np.array = None,
+        semantics: np.array = None,
+        instance: np.array = None,
+        groups=None,
+    ):
+        self.groups = groups
+        self._values = {
+            "coordinates": coordinates,
+            "semantics": None if semantics is None else semantics.reshape(-1),
+        }
+        self._unsorted = {
+            "intensity": None if intensity is None else intensity.reshape(-1),
+            "instance": None if instance is None else instance.reshape(-1),
+        }
+        if groups is None:
+            self._values.update(self._unsorted)
+
+    def __getitem__(self, name: str) -> np.array:
+        if name not in self._values and name in self._unsorted:
+            self._values[name] = self.groups.sort(self._unsorted[name])
+        elif name not in self._values:
+            self._values[name] = quantity_functions[name](self)
+        if self._values[name] is None:
+            raise ValueError("Quantity {name} is not available".format(name=name))
+        return self._values[name]
+
+    def get_buffer(self, name: str) -> np.array:
+        """ Return a scratch array with one value per point in the precision of the scan
+        """
+        coordinates = self._values["coordinates"]
+        return get_buffer(
+            name, coordinates.shape[0], np.result_type(coordinates.dtype, np.float32)
+        )
+
+
+def _get_range(q: ScanQuantities) -> np.array:
+    coordinates = q["coordinates"]
+    squared = q.get_buffer("squared")
+    out = q.get_buffer("range")
+    np.multiply(coordinates[:, 0], coordinates[:, 0], out=out)
+    for i in (1, 2):
+        np.multiply(coordinates[:, i], coordinates[:, i], out=squared)
+        np.add(out, squared, out=out)
+    return np.sqrt(out, out=out)
+
+
+def _get_azimuth(q: ScanQuantities) -> np.array:
+    coordinates = q["coordinates"]
+    out = q.get_buffer("azimuth")
+    np.arctan2(coordinates[:, 1], coordinates[:, 0], out=out)  # [-pi, pi]
+    # only shift the negative angles, 2pi rounds up in float32 and the mod would wrap
+    # angles just below it to 0
+    negative = get_buffer("negative", out.shape[0], bool)
+    np.less(out, 0, out=negative)
+    return np.add(out, 2 * np.pi, out=out, where=negative)  # [0, 2pi]
+
+
+def _get_elevation(q: ScanQuantities) -> np.array:
+    out = q.get_buffer("elevation")
+    np.true_divide(q["coordinates"][:, 2], q["range"], out=out)
+    np.arccos(out, out=out)  # [0, pi]
+    below = get_buffer("below", out.shape[0], bool)
+    np.greater(out, np.pi / 2, out=below)
+    np.mod(out, np.pi / 2, out=out, where=below)
+    return np.negative(out, out=out, where=below)  # [- pi/2, pi/2]
+
+
+def _get_inclination(q: ScanQuantities) -> np.array:
+    """ Angle above the horizontal plane, the elevation of the beam that hit a point """
+    out = q.get_buffer("inclination")
+    np.true_divide(q["coordinates"][:, 2], q["range"], out=out)
+    np.clip(out, -1, 1, out=out)  # rounding may exceed the domain of arcsin
+    return np.arcsin(out, out=out)  # [- pi/2, pi/2]
+
+
+def _get_height(q: ScanQuantities) -> np.array:
+    return q["coordinates"][:, 2]
+
+
+def _get_instance_size(q: ScanQuantities) -> np.array:
+    """ Number of points of the instance a point belongs to, NaN for no instance """
+    key = np.left_shift(q["semantics"].astype(np.int64), 16) + q["instance"]
+    _, inverse, counts = np.unique(key, return_inverse=True, return_counts=True)
+    size = counts[inverse.reshape(-1)].astype(np.float32)
+    size[q["instance"] == 0] = np.nan
+    return size
+
+
+register_quantity("range", _get_range)
+register_quantity("azimuth", _get_azimuth)
+register_quantity("elevation", _get_elevation)
+register_quantity("inclination", _get_inclination)
+register_quantity("height", _get_height)
+register_quantity("instance_size", _get_instance_size)
+
+register_axis(
+    "distance", "range", distance_bins, edges=distance_bins, label="Distance [m]"
+)
+register_axis(
+    "azimuth",
+    "azimuth",
+    np.multiply(azimuth_bins, np.pi / 180),
+    edges=np.append(azimuth_bins, 360),
+    label="Azimuth [degree]",
+)
+register_axis(
+    "elevation",
+    "elevation",
+    np.multiply(elevation_bins, np.pi / 180),
+    lower=True,
+    edges=elevation_bins,
+    label="Elevation [degree]",
+)
+register_axis("height", "height", height_bins, lower=True, label="Height [m]")
+register_axis("intensity", "intensity", intensity_bins, label="Intensity")
+register_axis(
+    "instance_size", "instance_size", instance_size_bins, label="Instance Size [points]"
+)
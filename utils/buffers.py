@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import threading
+
+import numpy as np
+
+# scratch arrays of the current thread, by name
+_buffers = threading.local()
+
+
+def get_buffer(name: str, size: int, dtype: np.dtype = np.float32) -> np.array:
+    """ Return a scratch array of this size that is reused for the following scans
+
+    Every thread has its own buffers, they grow to the largest scan seen so far. The
+    content is valid until the buffer of the same name and dtype is requested again,
+    i.e. only while the scan at hand is processed.
+    """
+    dtype = np.dtype(dtype)
+    buffers = _buffers.__dict__.setdefault("arrays", {})
+    buffer = buffers.get((name, dtype))
+    if buffer is None or buffer.shape[0] < size:
+        buffer = np.empty(size, dtype=dtype)
+        buffers[(name, dtype)] = buffer
+    return buffer[:size]
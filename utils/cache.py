@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import collections
+import hashlib
+import json
+import os
+
+import numpy as np
+from data import get_fingerprint
+
+from .sparse import pack_statistics, unpack_statistics
+
+# bump whenever the layout or the meaning of the cached statistics changes
+cache_version = 2
+
+
+def get_cache_dir(cache_root: str) -> str:
+    """ Return the cache directory for the current bin definitions and label mapping
+    """
+    return os.path.join(
+        cache_root, "v{v}_{f}".format(v=cache_version, f=get_fingerprint())
+    )
+
+
+def get_file_key(filenames: (str, str)) -> str:
+    """ Identify the state of the scan files by their path, size and modification time
+    """
+    key = []
+    for filename in filenames:
+        stat = os.stat(filename)
+        key.append([os.path.abspath(filename), stat.st_size, stat.st_mtime_ns])
+    return json.dumps(key)
+
+
+def get_cache_filename(cache_dir: str, filenames: (str, str)) -> str:
+    name = "\n".join(os.path.abspath(f) for f in filenames)
+    return os.path.join(cache_dir, hashlib.sha1(name.encode()).hexdigest() + ".npz")
+
+
+def load_cached(
+    cache_dir: str, filenames: (str, str), keys: list = None, expected: dict = None
+):
+    """ Return the cached partial statistics of a scan or None if they are outdated
+
+    If keys is given, only these statistics are returned and the entry counts as
+    outdated if one of them is missing. If expected (empty) statistics are given, see
+    create_statistics, the entry also counts as outdated if the shape of one of them
+    differs, e.g. a joint histogram over other axes.
+    """
+    cache_filename = get_cache_filename(cache_dir, filenames)
+    if not os.path.exists(cache_filename):
+        return None
+
+    with np.load(cache_filename) as cached:
+        if str(cached["key"]) != get_file_key(filenames):
+            return None
+        cached = unpack_statistics({k: cached[k] for k in cached.files if k != "key"})
+
+    names = list(cached) if keys is None else keys
+    if any(k not in cached for k in names):
+        return None
+    if expected is not None and any(
+        k not in cached or tuple(cached[k].shape) != tuple(v.shape)
+        for k, v in expected.items()
+    ):
+        return None
+    return collections.OrderedDict((k, cached[k]) for k in names)
+
+
+def save_cached(cache_dir: str, filenames: (str, str), partials: dict):
+    cache_filename = get_cache_filename(cache_dir, filenames)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    # write to a temporary file first, an interrupted run must not leave broken entries
+    tmp_filename = cache_filename + ".{pid}.tmp".format(pid=os.getpid())
+    with open(tmp_filename, "wb") as f:
+        np.savez(f, key=get_file_key(filenames), **pack_statistics(partials))
+    os.replace(tmp_filename, cache_filename)
+
+
+def compute_cached(
+    filenames: (str, str),
+    func,
+    cache_dir: str,
+    keys: list = None,
+    expected: dict = None,
+) -> dict:
+    """ Return the partial statistics of a scan from the cache or compute and cache them
+
+    Scans are cached one by one as soon as they are computed, so an interrupted run
+    resumes with the first scan that was not finished. keys and expected are those of
+    load_cached.
+    """
+    partials = load_cached(cache_dir, filenames, keys=keys, expected=expected)
+    if partials is None:
+        partials = func(filenames)
+        save_cached(cache_dir, filenames, partials)
+    return partials
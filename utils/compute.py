@@ -3,8 +3,38 @@
 __author__ = """Larissa Triess"""
 __email__ = "larissa@triess.eu"
 
+import collections
+
 import numpy as np
-from data import azimuth_bins, distance_bins, elevation_bins, get_num_learning_labels
+from data import get_num_learning_labels
+
+from .axes import ScanQuantities, axis_registry, default_axes, get_bins, get_num_bins
+from .grouping import LabelGroups
+from .profiling import profiler
+from .sparse import SparseHistogram
+
+
+def get_bin_indices(
+    data: np.array, bins: np.array, lower: bool = False
+) -> (np.array, np.array):
+    """ Return the bin index of every value and whether the value falls into a bin
+
+    Bin b holds all values in [bins[b], bins[b + 1]), the last bin is open to the top.
+    If lower is set, an additional underflow bin (-inf, bins[0]) is prepended.
+    Values below the first bin (without lower), NaN and +inf fall into no bin.
+    """
+    off = 0
+    if lower:
+        off = 1
+
+    # index of the bin the value falls into, -1 for values below the first bin
+    indices = np.searchsorted(bins, data, side="right")
+    if off != 1:
+        np.subtract(indices, 1 - off, out=indices)
+
+    valid = np.less(data, np.inf)  # drops NaN and +inf
+    np.logical_and(valid, indices >= 0, out=valid)
+    return indices, valid
 
 
 def get_counts(
@@ -14,55 +44,152 @@ def get_counts(
     restriction_bins_2: np.array,
     lower: bool = False,
 ):
+    """ Count the points per label and bin in a single pass over the data
 
-    off = 0
-    if lower:
-        off = 1
-    counter = np.zeros(
-        [restriction_1, restriction_bins_2.shape[0] + off], dtype=np.int64
+    See get_bin_indices for the bins, labels >= restriction_1 are not counted.
+    """
+    num_bins = restriction_bins_2.shape[0] + (1 if lower else 0)
+    bins, valid = get_bin_indices(data, restriction_bins_2, lower=lower)
+    valid = np.logical_and(valid, labels < restriction_1)
+
+    counter = np.bincount(
+        labels[valid].astype(np.int64) * num_bins + bins[valid],
+        minlength=restriction_1 * num_bins,
     )
-    for l in range(restriction_1):
-
-        # remove all points that are not of current label
-        depth_current_label = data[labels == l]
-
-        if lower:
-            r = (-1, restriction_bins_2.shape[0])
-        else:
-            r = (0, restriction_bins_2.shape[0])
-        for b in range(*r):
-            if b == -1:
-                bin_min = -np.inf
-                bin_max = restriction_bins_2[b + 1]
-            elif b == len(restriction_bins_2) - 1:
-                bin_min = restriction_bins_2[b]
-                bin_max = np.inf
-            else:
-                bin_min = restriction_bins_2[b]
-                bin_max = restriction_bins_2[b + 1]
-
-            counter[l, b + off] = np.sum(
-                np.logical_and(
-                    np.where(
-                        np.greater_equal(depth_current_label, bin_min), True, False
-                    ),
-                    np.where(np.less(depth_current_label, bin_max), True, False),
-                )
-            )
 
+    return counter.reshape([restriction_1, num_bins])
+
+
+def get_grouped_counts(
+    data: np.array, groups: LabelGroups, bins: np.array, lower: bool = False
+) -> np.array:
+    """ Count the points per label and bin of values sorted by label
+
+    Same as get_counts, but every label only counts its own segment of the data.
+    """
+    num_bins = bins.shape[0] + (1 if lower else 0)
+    indices, valid = get_bin_indices(data, bins, lower=lower)
+
+    counter = np.zeros([groups.num_labels, num_bins], dtype=np.int64)
+    for label, segment in groups.segments():
+        counter[label] = np.bincount(
+            indices[segment][valid[segment]], minlength=num_bins
+        )
     return counter
 
 
+def get_precision_mismatches(
+    coordinates: np.array,
+    axes: tuple = ("distance", "azimuth", "elevation", "height"),
+    tolerance: float = 1e-5,
+) -> dict:
+    """ Compare the bins of the points against the float64 computation
+
+    The quantities of the axes are computed from the coordinates in their precision
+    (float32 for the scan files) and from the coordinates converted to float64. Returns
+    per axis the number of points that fall into a different bin and the number of
+    those whose float64 value is further than tolerance (relative, at least 1) from
+    every bin edge. The latter must be 0, rounding can only move points across an edge.
+    """
+    single = ScanQuantities(coordinates)
+    double = ScanQuantities(coordinates.astype(np.float64))
+
+    mismatches = collections.OrderedDict()
+    for name in axes:
+        axis = axis_registry[name]
+        values = [single[axis.quantity], double[axis.quantity]]
+        (a, valid_a), (b, valid_b) = [
+            get_bin_indices(v, get_bins(name, v.dtype), lower=axis.lower)
+            for v in values
+        ]
+        differ = np.flatnonzero(np.logical_or(a != b, valid_a != valid_b))
+        edges = axis.bins.astype(np.float64)
+        if axis.quantity == "azimuth":
+            # the azimuth wraps around at 360 degree
+            edges = np.append(edges, 2 * np.pi)
+        distance = np.min(
+            np.abs(values[1][differ, np.newaxis] - edges)
+            / np.maximum(1.0, np.abs(edges)),
+            axis=1,
+            initial=np.inf,
+        )
+        mismatches[name] = (differ.shape[0], int(np.sum(distance > tolerance)))
+    return mismatches
+
+
+def get_joint_shape(axes: tuple = default_axes) -> tuple:
+    """ Return the shape of the joint label x axis_1 x ... x axis_n histogram
+
+    Every axis has one additional last slot for the points that fall into no bin of
+    that axis, so the marginals over single axes match the label matrices.
+    """
+    return tuple([get_num_learning_labels()] + [get_num_bins(a) + 1 for a in axes])
+
+
+def get_joint_statistics(
+    quantities: ScanQuantities, labels: np.array, axes: tuple = default_axes
+) -> SparseHistogram:
+    """ Bin the points of a scan jointly over the labels and all axes """
+    labels = labels.reshape(-1)
+    shape = get_joint_shape(axes)
+
+    with profiler.stage("joint histogram", points=labels.shape[0]):
+        keys = labels.astype(np.int64)
+        for name, size in zip(axes, shape[1:]):
+            axis = axis_registry[name]
+            data = quantities[axis.quantity]
+            indices, valid = get_bin_indices(
+                data, get_bins(name, data.dtype), lower=axis.lower
+            )
+            keys = keys * size + np.where(valid, indices, size - 1)
+
+        return SparseHistogram.from_keys(shape, keys[labels < shape[0]])
+
+
+def get_marginal_statistics(joint: SparseHistogram, axes: tuple = default_axes) -> dict:
+    """ Return the label x bin matrix of every axis as marginal of the joint histogram
+    """
+    counters = collections.OrderedDict()
+    for i, name in enumerate(axes):
+        counters[name] = joint.marginalize((0, i + 1))[:, :-1]
+    return counters
+
+
+def get_axis_statistics(
+    quantities: ScanQuantities, labels: np.array, axes: tuple = default_axes
+) -> dict:
+    """ Compute the label x bin matrices of all axes in one sweep over the scan
+
+    Quantities that are needed by several axes (e.g. the range) are computed once. If
+    the points are sorted by label, the counts of every label are taken from its
+    segment, see LabelGroups.
+    """
+    labels = labels.reshape(-1)
+    num_labels = get_num_learning_labels()
+
+    counters = collections.OrderedDict()
+    for name in axes:
+        axis = axis_registry[name]
+        with profiler.stage("{name} stats".format(name=name), points=labels.shape[0]):
+            data = quantities[axis.quantity]
+            bins = get_bins(name, data.dtype)
+            if quantities.groups is not None:
+                counters[name] = get_grouped_counts(
+                    data, quantities.groups, bins, lower=axis.lower
+                )
+            else:
+                counters[name] = get_counts(
+                    data, labels, num_labels, bins, lower=axis.lower
+                )
+    return counters
+
+
 def get_points_over_distance_and_label_statistics(
     coordinates: np.array, labels: np.array
 ) -> (np.array, np.array, np.array):
 
-    depth = np.linalg.norm(coordinates, 2, axis=1)
-    labels = labels[:, 0]
-
-    counter = get_counts(
-        depth, labels, get_num_learning_labels(), np.array(distance_bins)
-    )
+    counters = get_axis_statistics(ScanQuantities(coordinates), labels, ["distance"])
+    counter = counters["distance"]
 
     return np.sum(counter, axis=0), np.sum(counter, axis=1), counter
 
@@ -71,28 +198,8 @@ def get_points_over_angles_and_label_statistics(
     coordinates: np.array, labels: np.array
 ) -> (np.array, np.array):
 
-    azimuth = np.arctan2(coordinates[:, 1], coordinates[:, 0])  # [-pi, pi]
-    azimuth = np.mod(np.add(azimuth, 2 * np.pi), 2 * np.pi)  # [0, 2pi]
-    elevation = np.arccos(
-        np.true_divide(coordinates[:, 2], np.linalg.norm(coordinates, 2, axis=1))
-    )  # [0, pi]
-    elevation = np.where(
-        elevation > np.pi / 2, -np.mod(elevation, np.pi / 2), elevation
-    )  # [- pi/2, pi/2]
-    labels = labels[:, 0]
-
-    counter_a = get_counts(
-        azimuth,
-        labels,
-        get_num_learning_labels(),
-        np.multiply(azimuth_bins, np.pi / 180),
-    )
-    counter_e = get_counts(
-        elevation,
-        labels,
-        get_num_learning_labels(),
-        np.multiply(elevation_bins, np.pi / 180),
-        lower=True,
+    counters = get_axis_statistics(
+        ScanQuantities(coordinates), labels, ["azimuth", "elevation"]
     )
 
-    return counter_a, counter_e
+    return counters["azimuth"], counters["elevation"]
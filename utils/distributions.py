@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import collections
+import functools
+
+import numpy as np
+from data import distribution_accuracy, distribution_range, get_num_learning_labels
+
+from .axes import ScanQuantities
+from .moments import Moments
+from .profiling import profiler
+from .sparse import SparseHistogram
+
+# per-point quantities whose distribution is summarized per learning label
+distribution_quantities = ["range", "height", "intensity"]
+
+
+@functools.lru_cache(maxsize=None)
+def _get_sketch_mapping() -> (float, int, int):
+    """ Return the growth factor and the indices of the smallest and largest bin """
+    gamma = (1 + distribution_accuracy) / (1 - distribution_accuracy)
+    lowest, highest = [
+        int(np.ceil(np.log(m) / np.log(gamma))) for m in distribution_range
+    ]
+    return gamma, lowest, highest
+
+
+def get_num_sketch_bins() -> int:
+    """ Return the number of bins of a sketch: negative, zero and positive values """
+    _, lowest, highest = _get_sketch_mapping()
+    return 2 * (highest - lowest + 1) + 1
+
+
+def get_sketch_values() -> np.array:
+    """ Return the value every bin of the sketches stands for, ascending """
+    gamma, lowest, highest = _get_sketch_mapping()
+    magnitudes = 2 * gamma ** np.arange(lowest, highest + 1) / (gamma + 1)
+    return np.concatenate([-magnitudes[::-1], [0.0], magnitudes])
+
+
+def get_sketch_bins(values: np.array) -> np.array:
+    """ Return the sketch bin of every value
+
+    The bins grow geometrically: magnitude bin i holds (gamma^(i-1), gamma^i], so the
+    value it stands for is within the relative accuracy of all of them. Magnitudes
+    below distribution_range fall into the zero bin, above it into the largest bin.
+    """
+    gamma, lowest, highest = _get_sketch_mapping()
+    zero = highest - lowest + 1
+
+    magnitude = np.abs(values)
+    index = np.log(np.maximum(magnitude, distribution_range[0])) / np.log(gamma)
+    index = np.ceil(index)
+    index = np.clip(index, lowest, highest).astype(np.int64) - (lowest - 1)
+    bins = zero + np.where(values < 0, -index, index)
+    bins[magnitude < distribution_range[0]] = zero
+    return bins
+
+
+def create_distribution_statistics() -> dict:
+    """ Return empty distribution statistics, see get_distribution_statistics """
+    num_labels = get_num_learning_labels()
+    statistics = collections.OrderedDict()
+    for name in distribution_quantities:
+        statistics[name + "_sketch"] = SparseHistogram(
+            (num_labels, get_num_sketch_bins())
+        )
+        statistics[name + "_moments"] = Moments(num_labels)
+    return statistics
+
+
+def get_distribution_statistics(quantities: ScanQuantities) -> dict:
+    """ Summarize the distribution of range, height and intensity per label of a scan
+
+    The points must be sorted by label (see LabelGroups), so every label only touches
+    its own segment. Returns per quantity the label x bin quantile sketch, which counts
+    the points per geometric bin (see get_sketch_bins), and the Moments per label.
+    Both have a fixed size and are summed over any number of scans, see get_quantiles.
+    Non-finite values are not counted.
+    """
+    groups = quantities.groups
+    if groups is None:
+        raise ValueError("The distributions need the points sorted by label")
+    num_bins = get_num_sketch_bins()
+    size = groups.offsets[-1]  # points with a learning label
+
+    with profiler.stage("distribution stats", points=size):
+        statistics = collections.OrderedDict()
+        for name in distribution_quantities:
+            values = quantities[name][:size]
+            counts = groups.counts
+            finite = np.isfinite(values)
+            if not np.all(finite):
+                labels = np.repeat(np.arange(groups.num_labels), counts)[finite]
+                values = values[finite]
+                counts = np.bincount(labels, minlength=groups.num_labels)
+
+            bins = get_sketch_bins(values)
+            starts = np.cumsum(counts) - counts
+            sketch = np.zeros((groups.num_labels, num_bins), np.int64)
+            for label in np.flatnonzero(counts):
+                segment = slice(starts[label], starts[label] + counts[label])
+                sketch[label] = np.bincount(bins[segment], minlength=num_bins)
+
+            occupied = np.flatnonzero(sketch)
+            statistics[name + "_sketch"] = SparseHistogram(
+                sketch.shape, occupied, sketch.reshape(-1)[occupied]
+            )
+            statistics[name + "_moments"] = Moments.from_sorted(values, counts)
+    return statistics
+
+
+def get_quantiles(sketch: SparseHistogram, q: np.array) -> np.array:
+    """ Return the q-quantiles (label x q) from a sketch, NaN for labels without points
+
+    For magnitudes within distribution_range, the quantiles are within the relative
+    accuracy distribution_accuracy of the exact ones.
+    """
+    q = np.atleast_1d(q)
+    values = get_sketch_values()
+    cumulative = np.cumsum(sketch.to_dense(), axis=1)
+
+    quantiles = np.full((sketch.shape[0], q.shape[0]), np.nan)
+    for label in np.flatnonzero(cumulative[:, -1]):
+        ranks = q * (cumulative[label, -1] - 1)
+        quantiles[label] = values[np.searchsorted(cumulative[label], ranks, "right")]
+    return quantiles
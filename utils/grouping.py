@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import numpy as np
+
+
+class LabelGroups(object):
+    """ Order of the points of a scan sorted by learning label
+
+    The points are sorted once per scan with a stable counting (radix) sort of the
+    labels. Afterwards the points of every label are a contiguous segment, so per-label
+    statistics of all axes only touch the points of that label, without masking the
+    whole scan per label. Points with labels >= num_labels are sorted behind the last
+    segment and are not part of any.
+    """
+
+    def __init__(self, labels: np.array, num_labels: int):
+        # small unsigned keys, numpy sorts them stably with a radix sort
+        keys = np.minimum(labels.reshape(-1), num_labels).astype(
+            np.uint8 if num_labels < 2 ** 8 else np.uint16
+        )
+        self.num_labels = num_labels
+        self.order = np.argsort(keys, kind="stable")
+        self.counts = np.bincount(keys, minlength=num_labels + 1)[:num_labels]
+        self.offsets = np.concatenate([[0], np.cumsum(self.counts)])
+
+    def sort(self, values: np.array) -> np.array:
+        """ Return the values of the points (along the first axis) in label order """
+        if values is None:
+            return None
+        return np.take(values, self.order, axis=0)
+
+    def segments(self) -> list:
+        """ Return the (label, slice) of every label that has points """
+        return [
+            (label, slice(self.offsets[label], self.offsets[label + 1]))
+            for label in np.flatnonzero(self.counts)
+        ]
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import collections
+
+import numpy as np
+from data import (
+    distance_bins,
+    get_num_learning_labels,
+    instance_extent_bins,
+    instance_size_bins,
+)
+
+from .axes import ScanQuantities
+from .compute import get_counts
+from .profiling import profiler
+
+# statistics over the instances of a scan, each one per learning label
+instance_statistics = [
+    "instances_per_label",
+    "instance_points_label_matrix",
+    "instance_distance_label_matrix",
+    "instance_extent_label_matrix",
+]
+
+
+def create_instance_statistics() -> dict:
+    """ Return empty instance statistics, see get_instance_statistics """
+    num_labels = get_num_learning_labels()
+    statistics = collections.OrderedDict()
+    statistics["instances_per_label"] = np.zeros(num_labels, np.int64)
+    for name, bins in [
+        ("instance_points_label_matrix", instance_size_bins),
+        ("instance_distance_label_matrix", distance_bins),
+        ("instance_extent_label_matrix", instance_extent_bins),
+    ]:
+        statistics[name] = np.zeros([num_labels, len(bins)], np.int64)
+    return statistics
+
+
+def get_instances(
+    quantities: ScanQuantities, labels: np.array, moving: np.array = None
+) -> dict:
+    """ Group the points of a scan by instance
+
+    An instance is identified by its label and instance id, points without instance
+    id are ignored. Returns per instance the key (label << 16 | instance id), the label,
+    the number of points, the center, its range, the axis-aligned bounding box (lower
+    and upper corner) and whether any of its points is flagged as moving.
+    """
+    labels = labels.reshape(-1)
+    instance = quantities["instance"]
+    valid = np.logical_and(instance > 0, labels < get_num_learning_labels())
+
+    keys = np.left_shift(labels[valid].astype(np.int64), 16) + instance[valid]
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    coordinates = quantities["coordinates"][valid][order]
+    if moving is None:
+        moving = np.zeros(keys.shape[0], bool)
+    else:
+        moving = moving.reshape(-1)[valid][order]
+
+    if keys.shape[0] == 0:
+        return {
+            "key": np.zeros(0, np.int64),
+            "label": np.zeros(0, np.int64),
+            "points": np.zeros(0, np.int64),
+            "center": np.zeros([0, 3]),
+            "range": np.zeros(0),
+            "lower": np.zeros([0, 3]),
+            "upper": np.zeros([0, 3]),
+            "moving": np.zeros(0, bool),
+        }
+
+    # the points of an instance are contiguous after sorting by key
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    points = np.diff(np.append(starts, keys.shape[0]))
+    center = np.add.reduceat(coordinates, starts, axis=0, dtype=np.float64)
+    center /= points[:, np.newaxis]
+    return {
+        "key": keys[starts],
+        "label": np.right_shift(keys[starts], 16),
+        "points": points,
+        "center": center,
+        "range": np.linalg.norm(center, 2, axis=1),
+        "lower": np.minimum.reduceat(coordinates, starts, axis=0),
+        "upper": np.maximum.reduceat(coordinates, starts, axis=0),
+        "moving": np.logical_or.reduceat(moving, starts),
+    }
+
+
+def get_instance_statistics(instances: dict) -> dict:
+    """ Compute the instance statistics of a scan from its instances, see get_instances
+
+    Returns the number of instances per label and, per label, the number of instances
+    over their number of points, the range of their center and the longest side of
+    their bounding box.
+    """
+    num_labels = get_num_learning_labels()
+
+    with profiler.stage("instance stats", points=np.sum(instances["points"])):
+        extent = np.max(instances["upper"] - instances["lower"], axis=1)
+
+        statistics = collections.OrderedDict()
+        statistics["instances_per_label"] = np.bincount(
+            instances["label"], minlength=num_labels
+        )
+        for name, data, bins in [
+            ("instance_points_label_matrix", instances["points"], instance_size_bins),
+            ("instance_distance_label_matrix", instances["range"], distance_bins),
+            ("instance_extent_label_matrix", extent, instance_extent_bins),
+        ]:
+            statistics[name] = get_counts(
+                data, instances["label"], num_labels, np.asarray(bins)
+            )
+    return statistics
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import numpy as np
+
+
+class Moments(object):
+    """ Count, mean, sum of squared deviations, minimum and maximum per label
+
+    The moments of a scan are computed around the mean of every label (Welford), and
+    partial moments are combined with the parallel update of Chan et al. So they can
+    be merged in any order without the cancellation of summed squares.
+    """
+
+    # suffixes of the arrays the moments are stored as, see to_dict
+    suffixes = ("_count", "_mean", "_m2", "_min", "_max")
+
+    def __init__(
+        self,
+        num_labels: int,
+        count: np.array = None,
+        mean: np.array = None,
+        m2: np.array = None,
+        minimum: np.array = None,
+        maximum: np.array = None,
+    ):
+        self.num_labels = int(num_labels)
+        self.count = (
+            np.zeros(num_labels, np.int64) if count is None else count.astype(np.int64)
+        )
+        self.mean = np.zeros(num_labels) if mean is None else mean.astype(np.float64)
+        self.m2 = np.zeros(num_labels) if m2 is None else m2.astype(np.float64)
+        self.minimum = (
+            np.full(num_labels, np.inf)
+            if minimum is None
+            else minimum.astype(np.float64)
+        )
+        self.maximum = (
+            np.full(num_labels, -np.inf)
+            if maximum is None
+            else maximum.astype(np.float64)
+        )
+
+    @classmethod
+    def from_sorted(cls, values: np.array, counts: np.array) -> "Moments":
+        """ Compute the moments of values sorted by label, counts values per label """
+        moments = cls(counts.shape[0], counts)
+        labels = np.flatnonzero(counts)
+        if labels.shape[0] == 0:
+            return moments
+
+        starts = (np.cumsum(counts) - counts)[labels]
+        values = values.astype(np.float64)
+        moments.mean[labels] = np.add.reduceat(values, starts) / counts[labels]
+        deviation = values - np.repeat(moments.mean, counts)
+        moments.m2[labels] = np.add.reduceat(np.square(deviation), starts)
+        moments.minimum[labels] = np.minimum.reduceat(values, starts)
+        moments.maximum[labels] = np.maximum.reduceat(values, starts)
+        return moments
+
+    @property
+    def shape(self) -> tuple:
+        return (self.num_labels,)
+
+    @property
+    def variance(self) -> np.array:
+        """ Sample variance per label, NaN for less than two values """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.count > 1, self.m2 / (self.count - 1), np.nan)
+
+    @property
+    def std(self) -> np.array:
+        return np.sqrt(self.variance)
+
+    def add(self, other: "Moments") -> "Moments":
+        """ Add the moments of other values of the same labels in place """
+        if other.num_labels != self.num_labels:
+            raise ValueError(
+                "Cannot add moments of {a} and {b} labels".format(
+                    a=self.num_labels, b=other.num_labels
+                )
+            )
+        count = self.count + other.count
+        merged = count > 0
+        delta = other.mean - self.mean
+        with np.errstate(divide="ignore", invalid="ignore"):
+            share = np.where(merged, other.count / count, 0.0)
+        self.m2 += other.m2 + np.square(delta) * self.count * share
+        self.mean += delta * share
+        self.count = count
+        np.minimum(self.minimum, other.minimum, out=self.minimum)
+        np.maximum(self.maximum, other.maximum, out=self.maximum)
+        return self
+
+    def __iadd__(self, other: "Moments") -> "Moments":
+        return self.add(other)
+
+    def copy(self) -> "Moments":
+        return Moments(
+            self.num_labels,
+            self.count.copy(),
+            self.mean.copy(),
+            self.m2.copy(),
+            self.minimum.copy(),
+            self.maximum.copy(),
+        )
+
+    def to_dict(self) -> dict:
+        """ Return the arrays of the moments by suffix, see from_dict """
+        return dict(
+            zip(
+                self.suffixes,
+                [self.count, self.mean, self.m2, self.minimum, self.maximum],
+            )
+        )
+
+    @classmethod
+    def from_dict(cls, arrays: dict) -> "Moments":
+        count, mean, m2, minimum, maximum = [arrays[s] for s in cls.suffixes]
+        return cls(count.shape[0], count, mean, m2, minimum, maximum)
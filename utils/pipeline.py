@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import collections
+import multiprocessing
+
+import numpy as np
+from data import (
+    get_num_learning_labels,
+    is_moving,
+    iterate_chunks,
+    iterate_scans,
+    load_label_mapping,
+    load_scan,
+    map_learning,
+)
+from data.loader import label_dtype, point_dtype
+
+from .axes import ScanQuantities, default_axes, get_axis_key, get_num_bins
+from .compute import (
+    get_axis_statistics,
+    get_joint_shape,
+    get_joint_statistics,
+    get_marginal_statistics,
+)
+from .distributions import create_distribution_statistics, get_distribution_statistics
+from .grouping import LabelGroups
+from .instances import (
+    create_instance_statistics,
+    get_instance_statistics,
+    get_instances,
+)
+from .moments import Moments
+from .profiling import profile_key, profiler
+from .projection import create_range_image_statistics, get_range_image_statistics
+from .sparse import SparseHistogram
+from .tracks import get_frame_statistics
+from .voxels import get_voxel_shape, get_voxel_statistics
+
+# size of a point and its label in the scan files
+_bytes_per_point = point_dtype.itemsize + label_dtype.itemsize
+
+
+def get_axes(extra_axes: tuple = ()) -> tuple:
+    """ Return the default axes followed by the extra axes that are not among them """
+    return tuple(default_axes) + tuple(a for a in extra_axes if a not in default_axes)
+
+
+def create_statistics(
+    axes: tuple = default_axes,
+    joint: bool = False,
+    instances: bool = False,
+    voxels: bool = False,
+    range_image: bool = False,
+    distributions: bool = False,
+) -> dict:
+    """ Return empty statistics, see compute_statistics """
+    statistics = collections.OrderedDict()
+    if joint:
+        statistics["joint_histogram"] = SparseHistogram(get_joint_shape(get_axes(axes)))
+    else:
+        statistics["points_per_distance"] = np.zeros(get_num_bins("distance"), np.int64)
+        statistics["points_per_label"] = np.zeros(get_num_learning_labels(), np.int64)
+        for name in get_axes(axes):
+            statistics[get_axis_key(name)] = np.zeros(
+                [get_num_learning_labels(), get_num_bins(name)], dtype=np.int64
+            )
+    if instances:
+        statistics.update(create_instance_statistics())
+    if voxels:
+        statistics["voxel_histogram"] = SparseHistogram(get_voxel_shape())
+    if range_image:
+        statistics.update(create_range_image_statistics())
+    if distributions:
+        statistics.update(create_distribution_statistics())
+    return statistics
+
+
+def _get_label_statistics(counters: dict) -> dict:
+    statistics = collections.OrderedDict()
+    statistics["points_per_distance"] = np.sum(counters["distance"], axis=0)
+    statistics["points_per_label"] = np.sum(counters["distance"], axis=1)
+    for name, counter in counters.items():
+        statistics[get_axis_key(name)] = counter
+    return statistics
+
+
+def complete_statistics(statistics: dict, axes: tuple = default_axes) -> dict:
+    """ Add the label matrices as marginals of the joint histogram if there is one """
+    if "joint_histogram" not in statistics:
+        return statistics
+
+    joint = statistics["joint_histogram"]
+    completed = _get_label_statistics(get_marginal_statistics(joint, get_axes(axes)))
+    for key, value in statistics.items():
+        completed.setdefault(key, value)
+    return completed
+
+
+def compute_statistics(
+    sensor: np.array,
+    semantics: np.array,
+    intensity: np.array = None,
+    instance: np.array = None,
+    axes: tuple = default_axes,
+    joint: bool = False,
+    instances: bool = False,
+    tracks: bool = False,
+    voxels: bool = False,
+    range_image: bool = False,
+    distributions: bool = False,
+) -> dict:
+    """ Compute the partial statistics of a single scan
+
+    Returns the points per distance, points per label and the label x axis matrix of
+    every axis (e.g. distance_label_matrix), all axes are filled in one sweep.
+    With joint, only the sparse joint histogram over the labels and all axes is
+    returned, see complete_statistics. With instances, the statistics over the
+    instances of the scan are added, see get_instance_statistics. With tracks, the
+    observations of the instances are added, see TrackState. With voxels, the sparse
+    label x voxel histogram is added, see get_voxel_statistics. With range_image, the
+    statistics of the range image projection are added, see get_range_image_statistics.
+    With distributions, the quantile sketches and moments of range, height and
+    intensity per label are added, see get_distribution_statistics.
+    """
+    moving = is_moving(semantics) if instances or tracks else None
+    with profiler.stage("map_learning", points=semantics.shape[0]):
+        semantics = map_learning(semantics)
+
+    # all statistics are computed on the points sorted by label, intensity and instance
+    # are only sorted if they are used, see ScanQuantities
+    with profiler.stage("label grouping", points=semantics.shape[0]):
+        groups = LabelGroups(semantics, get_num_learning_labels())
+        sensor, semantics, moving = [
+            groups.sort(v) for v in (sensor, semantics, moving)
+        ]
+    quantities = ScanQuantities(
+        sensor,
+        intensity=intensity,
+        semantics=semantics,
+        instance=instance,
+        groups=groups,
+    )
+    if joint:
+        statistics = collections.OrderedDict()
+        statistics["joint_histogram"] = get_joint_statistics(
+            quantities, semantics, axes=get_axes(axes)
+        )
+    else:
+        counters = get_axis_statistics(quantities, semantics, axes=get_axes(axes))
+        statistics = _get_label_statistics(counters)
+    if instances or tracks:
+        with profiler.stage("instance grouping", points=semantics.shape[0]):
+            groups = get_instances(quantities, semantics, moving=moving)
+    if instances:
+        statistics.update(get_instance_statistics(groups))
+    if tracks:
+        statistics.update(get_frame_statistics(groups))
+    if voxels:
+        statistics.update(get_voxel_statistics(sensor, semantics))
+    if range_image:
+        statistics.update(get_range_image_statistics(quantities, semantics))
+    if distributions:
+        statistics.update(get_distribution_statistics(quantities))
+    return statistics
+
+
+def compute_scan_statistics(
+    filenames: (str, str),
+    mmap: bool = False,
+    axes: tuple = default_axes,
+    joint: bool = False,
+    instances: bool = False,
+    tracks: bool = False,
+    voxels: bool = False,
+    range_image: bool = False,
+    distributions: bool = False,
+) -> dict:
+    """ Load a single scan and compute its partial statistics """
+    with profiler.stage("loading") as info:
+        (sensor, intensity), (semantics, instance) = load_scan(filenames, mmap=mmap)
+        info["points"] = sensor.shape[0]
+        info["bytes"] = sensor.shape[0] * _bytes_per_point
+    return compute_statistics(
+        sensor,
+        semantics,
+        intensity,
+        instance,
+        axes=axes,
+        joint=joint,
+        instances=instances,
+        tracks=tracks,
+        voxels=voxels,
+        range_image=range_image,
+        distributions=distributions,
+    )
+
+
+def compute_chunked_statistics(
+    filenames: (str, str),
+    chunk_size: int = 2 ** 20,
+    mmap: bool = False,
+    axes: tuple = default_axes,
+    joint: bool = False,
+    voxels: bool = False,
+    distributions: bool = False,
+) -> dict:
+    """ Compute the statistics of a point and label file chunk by chunk
+
+    The files can hold any number of concatenated scans, only chunk_size points are in
+    memory at once. All statistics are sums over points, so accumulating the chunks
+    gives the same counts as processing every scan at once, and the same distributions
+    up to rounding. Per-instance statistics such as the instance_size axis are not
+    supported since instances can span chunks.
+    """
+    if "instance_size" in get_axes(axes):
+        raise ValueError("The instance_size axis cannot be computed in chunks")
+
+    statistics = create_statistics(
+        axes, joint=joint, voxels=voxels, distributions=distributions
+    )
+    chunks = iterate_chunks(filenames, chunk_size=chunk_size, mmap=mmap)
+    while True:
+        with profiler.stage("loading") as info:
+            chunk = next(chunks, None)
+            if chunk is not None:
+                info["points"] = chunk[0][0].shape[0]
+                info["bytes"] = chunk[0][0].shape[0] * _bytes_per_point
+        if chunk is None:
+            return statistics
+        (sensor, intensity), (semantics, instance) = chunk
+        accumulate(
+            statistics,
+            compute_statistics(
+                sensor,
+                semantics,
+                intensity,
+                instance,
+                axes=axes,
+                joint=joint,
+                voxels=voxels,
+                distributions=distributions,
+            ),
+        )
+
+
+def iterate_statistics(
+    filenames: list,
+    prefetch: int = 4,
+    mmap: bool = False,
+    axes: tuple = default_axes,
+    joint: bool = False,
+    instances: bool = False,
+    tracks: bool = False,
+    voxels: bool = False,
+    range_image: bool = False,
+    distributions: bool = False,
+):
+    """ Yield the partial statistics of all scans in order, computed in-process
+
+    The next scans are read in background threads while the current one is computed.
+    When profiling, loading is the time spent waiting for the next scan.
+    """
+    scans = iterate_scans(filenames, prefetch=prefetch, mmap=mmap)
+    for _ in filenames:
+        with profiler.stage("loading") as info:
+            (sensor, intensity), (semantics, instance) = next(scans)
+            info["points"] = sensor.shape[0]
+            info["bytes"] = sensor.shape[0] * _bytes_per_point
+        yield compute_statistics(
+            sensor,
+            semantics,
+            intensity,
+            instance,
+            axes=axes,
+            joint=joint,
+            instances=instances,
+            tracks=tracks,
+            voxels=voxels,
+            range_image=range_image,
+            distributions=distributions,
+        )
+
+
+def profile_scan(filenames: (str, str), func) -> dict:
+    """ Run func in a worker and send the profiling records back with the result """
+    partials = func(filenames)
+    partials[profile_key] = profiler.drain()
+    return partials
+
+
+def _init_worker(mapping: str, profile: bool):
+    # workers that are spawned instead of forked do not inherit a loaded mapping
+    if mapping is not None:
+        load_label_mapping(mapping)
+    profiler.enabled = profile
+    profiler.drain()
+
+
+def create_pool(workers: int, mapping: str = None, profile: bool = False):
+    """ Create a process pool with the label mapping loaded in every worker
+
+    Returns None for a single worker, the scans are then processed in-process.
+    """
+    if workers is None or workers <= 1:
+        return None
+    return multiprocessing.Pool(
+        workers, initializer=_init_worker, initargs=(mapping, profile)
+    )
+
+
+def map_scans(func, items: list, pool=None, chunksize: int = 4):
+    """ Apply func to all items, results are yielded in the order of the items
+
+    The ordered results allow a deterministic reduction in the parent process,
+    independent of the number of workers.
+    """
+    if pool is None:
+        return map(func, items)
+    return pool.imap(func, items, chunksize=chunksize)
+
+
+def create_empty_like(value):
+    """ Return empty statistics of the same kind and shape, to sum into """
+    if isinstance(value, SparseHistogram):
+        return SparseHistogram(value.shape)
+    if isinstance(value, Moments):
+        return Moments(value.num_labels)
+    return np.zeros_like(value)
+
+
+def accumulate(totals: dict, partials: dict) -> dict:
+    """ Add partial statistics to the running totals in place """
+    for key, partial in partials.items():
+        if isinstance(totals[key], (SparseHistogram, Moments)):
+            totals[key].add(partial)
+        else:
+            np.add(totals[key], partial, out=totals[key])
+    return totals
@@ -12,14 +12,17 @@ from data import (
     elevation_bins,
     get_names_learning,
     get_num_learning_labels,
+    voxel_range,
 )
 
+from .axes import axis_registry
+
 
 def draw_distance_and_label_matrix(matrix: np.array, save_dir: str = None):
     class_names, _, _ = get_names_learning()
 
     fig, ax = plt.subplots()
-    im = ax.pcolor(
+    im = ax.pcolormesh(
         matrix, norm=colors.LogNorm(vmin=1, vmax=np.max(matrix)), cmap=plt.cm.Blues
     )
     cbar = ax.figure.colorbar(im, ax=ax)
@@ -50,7 +53,7 @@ def draw_azimuth_and_label_matrix(matrix: np.array, save_dir: str = None):
     class_names, _, _ = get_names_learning()
 
     fig, ax = plt.subplots()
-    im = ax.pcolor(
+    im = ax.pcolormesh(
         matrix, norm=colors.LogNorm(vmin=1, vmax=np.max(matrix)), cmap=plt.cm.Blues
     )
     cbar = ax.figure.colorbar(im, ax=ax)
@@ -88,7 +91,7 @@ def draw_elevation_and_label_matrix(matrix: np.array, save_dir: str = None):
     class_names, _, _ = get_names_learning()
 
     fig, ax = plt.subplots()
-    im = ax.pcolor(
+    im = ax.pcolormesh(
         matrix, norm=colors.LogNorm(vmin=1, vmax=np.max(matrix)), cmap=plt.cm.Blues
     )
     cbar = ax.figure.colorbar(im, ax=ax)
@@ -120,6 +123,125 @@ def draw_elevation_and_label_matrix(matrix: np.array, save_dir: str = None):
         plt.close()
 
 
+def draw_axis_and_label_matrix(matrix: np.array, name: str, save_dir: str = None):
+    """ Draw the label matrix of any registered axis """
+    class_names, _, _ = get_names_learning()
+    axis = axis_registry[name]
+
+    fig, ax = plt.subplots()
+    im = ax.pcolormesh(
+        matrix, norm=colors.LogNorm(vmin=1, vmax=np.max(matrix)), cmap=plt.cm.Blues
+    )
+    cbar = ax.figure.colorbar(im, ax=ax)
+    cbar.ax.set_ylabel("Number of Points", rotation=90)
+
+    ax.set_xlabel(axis.label)
+    ax.set_xticks(np.arange(len(axis.edges)) + (1 if axis.lower else 0))
+    ax.set_xticklabels(axis.edges, ha="right", rotation=45, rotation_mode="anchor")
+    ax.xaxis.set_label_position("bottom")
+    ax.xaxis.tick_bottom()
+    for i, l in enumerate(ax.xaxis.get_ticklabels()):
+        l.set_visible(i % max(1, len(axis.edges) // 16) == 0)
+
+    ax.set_ylabel("Class Label")
+    ax.set_yticks(np.arange(matrix.shape[0] + 1))
+    ax.set_yticklabels(class_names, va="bottom")
+    ax.yaxis.set_label_position("left")
+    ax.yaxis.tick_left()
+
+    plt.tight_layout()
+
+    if save_dir is None:
+        plt.show()
+    else:
+        plt.savefig(save_dir)
+        plt.close()
+
+
+def draw_bev_label_heatmaps(heatmaps: np.array, save_dir: str = None):
+    """ Draw the bird's eye view heatmap (label x X x Y) of every label """
+    class_names, _, _ = get_names_learning()
+    (x_min, x_max), (y_min, y_max), _ = voxel_range
+
+    cols = 5
+    rows = int(np.ceil(heatmaps.shape[0] / cols))
+    fig, axes = plt.subplots(rows, cols, figsize=(3 * cols, 3 * rows))
+    for label, ax in enumerate(axes.reshape(-1)):
+        ax.set_axis_off()
+        if label >= heatmaps.shape[0]:
+            continue
+        ax.set_title(class_names[label])
+        if not np.any(heatmaps[label]):
+            continue
+        ax.imshow(
+            np.ma.masked_equal(heatmaps[label].T, 0),
+            origin="lower",
+            extent=(x_min, x_max, y_min, y_max),
+            norm=colors.LogNorm(vmin=1, vmax=np.max(heatmaps[label])),
+            cmap=plt.cm.Blues,
+        )
+
+    plt.tight_layout()
+
+    if save_dir is None:
+        plt.show()
+    else:
+        plt.savefig(save_dir)
+        plt.close()
+
+
+def draw_range_image_statistics(
+    empty_rate: np.array, collision_rate: np.array, save_dir: str = None
+):
+    """ Draw the empty pixel rate and the collisions per pixel of the range image """
+    fig, axes = plt.subplots(2, 1, figsize=(12, 4))
+    for ax, image, title in [
+        (axes[0], empty_rate, "Empty Pixel Rate"),
+        (axes[1], collision_rate, "Colliding Points per Scan"),
+    ]:
+        im = ax.imshow(image, aspect="auto", interpolation="nearest", cmap=plt.cm.Blues)
+        ax.figure.colorbar(im, ax=ax)
+        ax.set_title(title)
+        ax.set_xlabel("Column")
+        ax.set_ylabel("Beam")
+
+    plt.tight_layout()
+
+    if save_dir is None:
+        plt.show()
+    else:
+        plt.savefig(save_dir)
+        plt.close()
+
+
+def draw_label_distribution(
+    quantiles: np.array, mean: np.array, name: str, save_dir: str = None
+):
+    """ Draw the 1, 25, 50, 75 and 99 percent quantiles and the mean of every label """
+    labels = np.arange(get_num_learning_labels())
+
+    fig, ax = plt.subplots()
+    ax.vlines(labels, quantiles[:, 0], quantiles[:, 4], color="tab:blue")
+    ax.vlines(labels, quantiles[:, 1], quantiles[:, 3], color="tab:blue", linewidth=6)
+    ax.scatter(labels, quantiles[:, 2], color="white", marker="_", zorder=3)
+    ax.scatter(labels, mean, color="tab:red", marker="x", zorder=3)
+
+    ax.set_xlabel("Class Label")
+    ax.set_xticks(labels)
+    ax.set_xticklabels(
+        get_names_learning()[0], ha="right", rotation=45, rotation_mode="anchor"
+    )
+    ax.set_ylabel(name.capitalize())
+
+    plt.tight_layout()
+
+    if save_dir is None:
+        plt.show()
+    else:
+        plt.savefig(save_dir)
+        plt.close()
+
+
 def draw_points_per_distance(ppd: np.array, save_dir: str = None):
 
     fig, ax = plt.subplots()
@@ -164,18 +286,22 @@ def draw_points_per_label(ppl: np.array, save_dir: str = None):
         plt.close()
 
 
-def draw_distance_and_sequence_matrix(matrix: np.array, save_dir: str = None):
+def draw_distance_and_sequence_matrix(
+    matrix: np.array, sequences: list = None, save_dir: str = None
+):
 
     fig, ax = plt.subplots()
-    im = ax.pcolor(
+    im = ax.pcolormesh(
         matrix.T, norm=colors.LogNorm(vmin=1, vmax=np.max(matrix)), cmap=plt.cm.Blues
     )
     cbar = ax.figure.colorbar(im, ax=ax)
     cbar.ax.set_ylabel("Number of Points", rotation=90)
 
+    if sequences is None:
+        sequences = range(matrix.shape[0])
     ax.set_xlabel("Sequence")
     ax.set_xticks(np.arange(matrix.shape[0]))
-    ax.set_xticklabels(["{i:02d}".format(i=i) for i in range(11)], ha="center")
+    ax.set_xticklabels(["{i:02d}".format(i=i) for i in sequences], ha="center")
     ax.set_xticks([float(n) + 0.5 for n in ax.get_xticks()])
     ax.xaxis.set_label_position("bottom")
     ax.xaxis.tick_bottom()
@@ -195,19 +321,23 @@ def draw_distance_and_sequence_matrix(matrix: np.array, save_dir: str = None):
         plt.close()
 
 
-def draw_label_and_sequence_matrix(matrix: np.array, save_dir: str = None):
+def draw_label_and_sequence_matrix(
+    matrix: np.array, sequences: list = None, save_dir: str = None
+):
     class_names, _, _ = get_names_learning()
 
     fig, ax = plt.subplots()
-    im = ax.pcolor(
+    im = ax.pcolormesh(
         matrix.T, norm=colors.LogNorm(vmin=1, vmax=np.max(matrix)), cmap=plt.cm.Blues
     )
     cbar = ax.figure.colorbar(im, ax=ax)
     cbar.ax.set_ylabel("Number of Points", rotation=90)
 
+    if sequences is None:
+        sequences = range(matrix.shape[0])
     ax.set_xlabel("Sequence")
     ax.set_xticks(np.arange(matrix.shape[0]))
-    ax.set_xticklabels(["{i:02d}".format(i=i) for i in range(11)], ha="center")
+    ax.set_xticklabels(["{i:02d}".format(i=i) for i in sequences], ha="center")
     ax.set_xticks([float(n) + 0.5 for n in ax.get_xticks()])
     ax.xaxis.set_label_position("bottom")
     ax.xaxis.tick_bottom()
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+
+# sequence is None for records that do not belong to a sequence
+Record = collections.namedtuple(
+    "Record", ["stage", "start", "duration", "bytes", "points", "sequence", "pid", "tid"]
+)
+
+# key under which workers send their records back together with the statistics
+profile_key = "profile_records"
+
+
+class Profiler(object):
+    """ Collects wall time, bytes read and points processed per stage
+
+    Disabled by default, a disabled profiler only costs a function call per stage.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.sequence = None
+        self.records = []
+
+    @contextlib.contextmanager
+    def stage(self, name: str, bytes_read: int = 0, points: int = 0):
+        """ Time the enclosed block, bytes and points can be updated in the yielded dict
+        """
+        if not self.enabled:
+            yield {}
+            return
+
+        info = {"bytes": bytes_read, "points": points}
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            self.records.append(
+                Record(
+                    stage=name,
+                    start=start,
+                    duration=time.perf_counter() - start,
+                    bytes=int(info["bytes"]),
+                    points=int(info["points"]),
+                    sequence=self.sequence,
+                    pid=os.getpid(),
+                    tid=threading.get_ident(),
+                )
+            )
+
+    def drain(self) -> list:
+        """ Return and remove all records collected so far """
+        records, self.records = self.records, []
+        return records
+
+    def add(self, records: list, sequence: int = None):
+        """ Add records of another process, assigned to the given sequence """
+        self.records.extend(r._replace(sequence=sequence) for r in records)
+
+    def get_records(self, sequence: int = None) -> list:
+        if sequence is None:
+            return list(self.records)
+        return [r for r in self.records if r.sequence == sequence]
+
+
+# profiler of the current process
+profiler = Profiler()
+
+
+def summarize(records: list) -> dict:
+    """ Return calls, seconds, bytes and points per stage, in order of appearance """
+    summary = collections.OrderedDict()
+    for r in records:
+        entry = summary.setdefault(r.stage, [0, 0.0, 0, 0])
+        entry[0] += 1
+        entry[1] += r.duration
+        entry[2] += r.bytes
+        entry[3] += r.points
+    return summary
+
+
+def format_summary(title: str, records: list) -> str:
+    lines = [
+        title,
+        "{0:<22} {1:>7} {2:>10} {3:>10} {4:>14}".format(
+            "stage", "calls", "seconds", "MB read", "points"
+        ),
+    ]
+    for stage, (calls, seconds, num_bytes, points) in summarize(records).items():
+        lines.append(
+            "{0:<22} {1:>7d} {2:>10.3f} {3:>10.1f} {4:>14d}".format(
+                stage, calls, seconds, num_bytes / 2 ** 20, points
+            )
+        )
+    return "\n".join(lines)
+
+
+def write_trace(path: str, records: list):
+    """ Write the records in the Chrome trace event format (chrome://tracing) """
+    start = min([r.start for r in records] or [0.0])
+    events = [
+        {
+            "name": r.stage,
+            "cat": "sequence {s}".format(s=r.sequence),
+            "ph": "X",
+            "ts": (r.start - start) * 1e6,
+            "dur": r.duration * 1e6,
+            "pid": r.pid,
+            "tid": r.tid,
+            "args": {"bytes": r.bytes, "points": r.points, "sequence": r.sequence},
+        }
+        for r in records
+    ]
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import collections
+import functools
+
+import numpy as np
+from data import elevation_bins, get_num_learning_labels, range_image_width
+
+from .axes import ScanQuantities
+from .profiling import profiler
+from .sparse import SparseHistogram
+
+
+def get_range_image_shape() -> (int, int):
+    """ Return the rows (one per beam) and columns of the range image """
+    return len(elevation_bins), range_image_width
+
+
+@functools.lru_cache(maxsize=None)
+def get_row_boundaries() -> np.array:
+    """ Return the elevations [rad] halfway between neighbouring beams, ascending """
+    beams = np.deg2rad(np.sort(elevation_bins))
+    return (beams[1:] + beams[:-1]) / 2
+
+
+def get_pixel_indices(quantities: ScanQuantities) -> np.array:
+    """ Return the linear range image pixel of every point
+
+    A point falls into the row of the beam with the closest inclination, the top beam
+    is row 0. The columns split the azimuth evenly.
+    """
+    rows, cols = get_range_image_shape()
+    row = rows - 1 - np.searchsorted(get_row_boundaries(), quantities["inclination"])
+    col = (quantities["azimuth"] * (cols / (2 * np.pi))).astype(np.int64) % cols
+    return row * cols + col
+
+
+def create_range_image_statistics() -> dict:
+    """ Return empty range image statistics, see get_range_image_statistics """
+    shape = get_range_image_shape()
+    statistics = collections.OrderedDict()
+    statistics["range_image_scans"] = np.zeros(1, np.int64)
+    statistics["range_image_label_histogram"] = SparseHistogram(
+        (get_num_learning_labels(),) + shape
+    )
+    statistics["range_image_collision_histogram"] = SparseHistogram(shape)
+    statistics["occluded_points_per_label"] = np.zeros(
+        get_num_learning_labels(), np.int64
+    )
+    return statistics
+
+
+def get_range_image_statistics(quantities: ScanQuantities, labels: np.array) -> dict:
+    """ Project a scan into the range image and count what every pixel shows
+
+    If several points fall into a pixel, the closest one is shown. Returns the scan
+    count, per label and pixel whether the label is shown, per pixel the number of
+    points that collide with the shown one, and per label the number of these
+    occluded points. Pixels that show no label in a scan are empty.
+    """
+    labels = labels.reshape(-1)
+    num_labels = get_num_learning_labels()
+    shape = get_range_image_shape()
+
+    with profiler.stage("range image stats", points=labels.shape[0]):
+        pixels = get_pixel_indices(quantities)
+        valid = np.logical_and(labels < num_labels, np.isfinite(quantities["range"]))
+        pixels = pixels[valid]
+        labels = labels[valid].astype(np.int64)
+
+        statistics = create_range_image_statistics()
+        statistics["range_image_scans"] += 1
+        if pixels.shape[0] == 0:
+            # all pixels of the scan are empty
+            return statistics
+
+        # sorted by pixel and then range, the first point of every pixel is shown
+        order = np.lexsort((quantities["range"][valid], pixels))
+        pixels = pixels[order]
+        labels = labels[order]
+        shown = np.concatenate([[True], pixels[1:] != pixels[:-1]])
+
+        collisions = np.bincount(pixels[~shown])
+        collided = np.flatnonzero(collisions)
+
+        statistics["range_image_label_histogram"] = SparseHistogram.from_keys(
+            (num_labels,) + shape, labels[shown] * (shape[0] * shape[1]) + pixels[shown]
+        )
+        statistics["range_image_collision_histogram"] = SparseHistogram(
+            shape, collided, collisions[collided]
+        )
+        statistics["occluded_points_per_label"] = np.bincount(
+            labels[~shown], minlength=num_labels
+        )
+    return statistics
+
+
+def get_empty_pixel_rate(label_histogram: SparseHistogram, num_scans: int) -> np.array:
+    """ Return the share of the scans in which every pixel is empty """
+    return 1.0 - label_histogram.marginalize((1, 2)) / max(1, num_scans)
+
+
+def get_collision_rate(
+    collision_histogram: SparseHistogram, num_scans: int
+) -> np.array:
+    """ Return the mean number of points per scan that collide in every pixel """
+    return collision_histogram.to_dense() / max(1, num_scans)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import importlib
+import multiprocessing
+
+from data import load_label_mapping
+
+
+def _init_renderer(mapping: str):
+    import matplotlib.pyplot as plt
+
+    # headless backend, the plots are only saved to files
+    plt.switch_backend("Agg")
+    if mapping is not None:
+        load_label_mapping(mapping)
+
+
+def _draw(name: str, *args, **kwargs):
+    # the plotting stack (matplotlib) is only imported once the first plot is drawn
+    func = getattr(importlib.import_module("utils.plots"), name)
+    func(*args, **kwargs)
+
+
+class PlotRenderer(object):
+    """ Renders the plots in background processes while the computation continues
+
+    Plots are only rendered in the background if they are saved to files. Plots that
+    are shown on display are drawn right away, disabled plots are skipped. The plot
+    functions are given by name, so utils.plots is not imported if nothing is drawn.
+    """
+
+    def __init__(self, workers: int = 0, mapping: str = None, enabled: bool = True):
+        self.enabled = enabled
+        self._pool = None
+        self._results = []
+        if enabled and workers > 0:
+            self._pool = multiprocessing.Pool(
+                workers, initializer=_init_renderer, initargs=(mapping,)
+            )
+
+    def draw(self, name: str, *args, save_dir: str = None, **kwargs):
+        """ Draw a plot with the function of utils.plots of this name """
+        if not self.enabled:
+            return
+        if save_dir is None or self._pool is None:
+            _draw(name, *args, save_dir=save_dir, **kwargs)
+            return
+        self._results.append(
+            self._pool.apply_async(
+                _draw, (name,) + args, dict(kwargs, save_dir=save_dir)
+            )
+        )
+
+    def close(self):
+        """ Wait until all plots are rendered, errors of the workers are raised here """
+        if self._pool is None:
+            return
+        self._pool.close()
+        for result in self._results:
+            result.get()
+        self._pool.join()
+        self._pool = None
+        self._results = []
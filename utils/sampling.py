@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import collections
+
+import numpy as np
+
+from .store import get_sequence_key, interval_suffix
+
+# two-sided 95% quantile of the standard normal distribution
+_z_95 = 1.959963984540054
+
+
+def sample_scans(
+    filenames: list, every: int = None, fraction: float = None, seed: tuple = 0
+) -> list:
+    """ Return a sample of the scans of a sequence, in scan order
+
+    Either every k-th scan, or a stratified random fraction: the sequence is split into
+    equally long strata and one random scan is drawn from each, so the sample covers
+    the whole sequence. seed is an int or tuple, e.g. (seed, sequence). Without every
+    and fraction, all scans are returned.
+    """
+    if every is not None:
+        return filenames[::every]
+    if fraction is None:
+        return filenames
+
+    num_samples = min(len(filenames), max(1, int(round(fraction * len(filenames)))))
+    bounds = [len(filenames) * i // num_samples for i in range(num_samples + 1)]
+    rng = np.random.RandomState(seed)
+    return [filenames[rng.randint(a, b)] for a, b in zip(bounds[:-1], bounds[1:])]
+
+
+def create_squares(statistics: dict) -> dict:
+    """ Return empty sums of squares of the statistics, see accumulate_squares """
+    return collections.OrderedDict(
+        (key, np.zeros(value.shape, np.float64)) for key, value in statistics.items()
+    )
+
+
+def accumulate_squares(squares: dict, partials: dict) -> dict:
+    """ Add the squared partial statistics of a scan to the sums of squares in place """
+    for key, partial in partials.items():
+        squares[key] += np.square(partial, dtype=np.float64)
+    return squares
+
+
+def estimate_statistics(
+    statistics: dict, squares: dict, num_sampled: int, num_scans: int
+) -> (dict, dict):
+    """ Scale the statistics of the sampled scans up to all scans of the sequence
+
+    Returns the estimated counts and the half-widths of their 95% confidence intervals
+    per cell. The scans are treated as a simple random sample (with finite population
+    correction), which is conservative for strata of similar consecutive frames.
+    """
+    estimates = collections.OrderedDict()
+    intervals = collections.OrderedDict()
+    for key, total in statistics.items():
+        if num_sampled == 0:
+            estimates[key] = np.zeros_like(total)
+            intervals[key] = np.zeros(total.shape, np.float64)
+            continue
+
+        mean = total / num_sampled
+        if num_sampled > 1:
+            variance = (squares[key] - num_sampled * np.square(mean)) / (
+                num_sampled - 1
+            )
+        else:
+            variance = np.zeros(total.shape, np.float64)
+        correction = 1.0 - num_sampled / num_scans
+        estimates[key] = np.round(num_scans * mean).astype(np.int64)
+        intervals[key] = (
+            _z_95
+            * num_scans
+            * np.sqrt(np.maximum(variance, 0.0) * correction / num_sampled)
+        )
+    return estimates, intervals
+
+
+def get_total_intervals(statistics: dict, sequences: list) -> dict:
+    """ Return the confidence intervals of the totals over the independent sequences """
+    intervals = collections.OrderedDict()
+    for total, name in [
+        ("total_distance_label_matrix", "distance_label_matrix"),
+        ("total_points_per_distance", "points_per_distance"),
+        ("total_points_per_label", "points_per_label"),
+    ]:
+        intervals[total + interval_suffix] = np.sqrt(
+            sum(
+                np.square(statistics[get_sequence_key(s, name + interval_suffix)])
+                for s in sequences
+            )
+        )
+    return intervals
+
+
+def get_relative_error(estimate: np.array, interval: np.array) -> float:
+    """ Return the median relative error bound over the non-empty cells """
+    nonzero = estimate > 0
+    if not np.any(nonzero):
+        return 0.0
+    return float(np.median(interval[nonzero] / estimate[nonzero]))
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import numpy as np
+
+from .moments import Moments
+
+# suffixes of the arrays a sparse histogram is stored as
+_sparse_suffixes = ("_shape", "_keys", "_counts")
+
+
+class SparseHistogram(object):
+    """ Histogram over a large, mostly empty grid
+
+    Only the occupied cells are stored, as sorted linear cell indices (keys) and their
+    counts. Added histograms are buffered and merged in batches, so accumulating many
+    small histograms does not re-sort the total every time.
+    """
+
+    def __init__(self, shape: tuple, keys: np.array = None, counts: np.array = None):
+        self.shape = tuple(int(s) for s in shape)
+        self._keys = np.zeros(0, np.int64) if keys is None else keys.astype(np.int64)
+        self._counts = (
+            np.zeros(0, np.int64) if counts is None else counts.astype(np.int64)
+        )
+        self._pending = []
+        self._num_pending = 0
+
+    @classmethod
+    def from_keys(cls, shape: tuple, keys: np.array) -> "SparseHistogram":
+        """ Count the occurrences of the linear cell indices """
+        keys, counts = np.unique(keys, return_counts=True)
+        return cls(shape, keys, counts)
+
+    @property
+    def keys(self) -> np.array:
+        self.compact()
+        return self._keys
+
+    @property
+    def counts(self) -> np.array:
+        self.compact()
+        return self._counts
+
+    @property
+    def nnz(self) -> int:
+        return self.keys.shape[0]
+
+    def add(self, other: "SparseHistogram") -> "SparseHistogram":
+        """ Add the counts of another histogram of the same shape in place """
+        if other.shape != self.shape:
+            raise ValueError(
+                "Cannot add histograms of shape {a} and {b}".format(
+                    a=self.shape, b=other.shape
+                )
+            )
+        other.compact()
+        self._pending.append((other._keys, other._counts))
+        self._num_pending += other._keys.shape[0]
+        if self._num_pending > max(self._keys.shape[0], 2 ** 20):
+            self.compact()
+        return self
+
+    def __iadd__(self, other: "SparseHistogram") -> "SparseHistogram":
+        return self.add(other)
+
+    def compact(self):
+        """ Merge the buffered histograms into the sorted keys and counts """
+        if not self._pending:
+            return
+        keys = np.concatenate([self._keys] + [k for k, _ in self._pending])
+        counts = np.concatenate([self._counts] + [c for _, c in self._pending])
+        self._keys, inverse = np.unique(keys, return_inverse=True)
+        # float weights are exact for counts below 2**53
+        self._counts = np.bincount(
+            inverse.reshape(-1), weights=counts, minlength=self._keys.shape[0]
+        ).astype(np.int64)
+        self._pending = []
+        self._num_pending = 0
+
+    def marginalize(self, dims: tuple) -> np.array:
+        """ Return the dense histogram over the given dimensions, summed over the rest
+        """
+        dims = tuple(dims)
+        shape = tuple(self.shape[d] for d in dims)
+        if self.nnz == 0:
+            return np.zeros(shape, dtype=np.int64)
+
+        indices = np.unravel_index(self.keys, self.shape)
+        keys = np.ravel_multi_index(tuple(indices[d] for d in dims), shape)
+        dense = np.bincount(keys, weights=self.counts, minlength=int(np.prod(shape)))
+        return dense.astype(np.int64).reshape(shape)
+
+    def to_dense(self) -> np.array:
+        return self.marginalize(range(len(self.shape)))
+
+    def __getstate__(self):
+        self.compact()
+        return {"shape": self.shape, "keys": self._keys, "counts": self._counts}
+
+    def __setstate__(self, state):
+        self.__init__(state["shape"], state["keys"], state["counts"])
+
+
+def pack_statistics(statistics: dict) -> dict:
+    """ Replace sparse histograms and moments by plain arrays, e.g. to save them in an
+    npz file
+    """
+    packed = {}
+    for key, value in statistics.items():
+        if isinstance(value, SparseHistogram):
+            packed[key + "_shape"] = np.asarray(value.shape, dtype=np.int64)
+            packed[key + "_keys"] = value.keys
+            packed[key + "_counts"] = value.counts
+        elif isinstance(value, Moments):
+            for suffix, array in value.to_dict().items():
+                packed[key + suffix] = array
+        else:
+            packed[key] = value
+    return packed
+
+
+def _get_packed(packed: dict, suffixes: tuple) -> set:
+    first = suffixes[0]
+    return set(
+        key[: -len(first)]
+        for key in packed
+        if key.endswith(first)
+        and all(key[: -len(first)] + s in packed for s in suffixes)
+    )
+
+
+def unpack_statistics(packed: dict) -> dict:
+    """ Restore the sparse histograms and moments of statistics packed with
+    pack_statistics
+    """
+    sparse = _get_packed(packed, _sparse_suffixes)
+    moments = _get_packed(packed, Moments.suffixes)
+
+    statistics = {}
+    for key, value in packed.items():
+        base = [b for b in sparse if key in (b + s for s in _sparse_suffixes)]
+        moments_base = [b for b in moments if key in (b + s for s in Moments.suffixes)]
+        if base:
+            if key.endswith("_shape"):
+                statistics[base[0]] = SparseHistogram(
+                    packed[key], packed[base[0] + "_keys"], packed[base[0] + "_counts"]
+                )
+        elif moments_base:
+            if key.endswith(Moments.suffixes[0]):
+                statistics[moments_base[0]] = Moments.from_dict(
+                    {s: packed[moments_base[0] + s] for s in Moments.suffixes}
+                )
+        else:
+            statistics[key] = value
+    return statistics
@@ -0,0 +1,357 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import collections
+import glob
+import os
+
+import numpy as np
+from data import (
+    azimuth_bins,
+    distance_bins,
+    distribution_accuracy,
+    distribution_range,
+    elevation_bins,
+    get_fingerprint,
+    get_names_learning,
+    instance_extent_bins,
+    range_image_width,
+    track_displacement_bins,
+    track_lifetime_bins,
+    track_reappearance_bins,
+    voxel_range,
+    voxel_size,
+)
+
+from .axes import axis_registry, get_axis_key
+from .moments import Moments
+from .pipeline import accumulate, create_empty_like
+from .sparse import SparseHistogram, pack_statistics, unpack_statistics
+
+store_filename = "statistics.npz"
+partial_pattern = "statistics_*_of_*.npz"
+
+# suffix of the confidence interval half-widths of an estimated statistic
+interval_suffix = "_ci"
+
+# statistics that are stored for every sequence, prefixed with the sequence id
+sequence_statistics = [
+    "points_per_distance",
+    "points_per_label",
+    "distance_label_matrix",
+    "azimuth_label_matrix",
+    "elevation_label_matrix",
+]
+total_statistics = [
+    "total_distance_label_matrix",
+    "total_points_per_distance",
+    "total_points_per_label",
+    "sequence_distance_matrix",
+    "sequence_label_matrix",
+]
+# optional statistics that are summed over all sequences, stored as total_{name}
+summed_statistics = [
+    "voxel_histogram",
+    "range_image_scans",
+    "range_image_label_histogram",
+    "range_image_collision_histogram",
+    "occluded_points_per_label",
+    "range_sketch",
+    "range_moments",
+    "height_sketch",
+    "height_moments",
+    "intensity_sketch",
+    "intensity_moments",
+]
+
+
+def get_sequence_key(sequence: int, name: str) -> str:
+    return "{0:02d}_{1}".format(sequence, name)
+
+
+def is_sequence_key(key: str) -> bool:
+    return key[:2].isdigit() and key[2:3] == "_"
+
+
+def get_total_statistics(statistics: dict, sequences: list) -> dict:
+    """ Return the totals over the sequences and the per-sequence overviews """
+    pplds = np.stack(
+        [statistics[get_sequence_key(s, "distance_label_matrix")] for s in sequences]
+    )
+
+    ppld = np.sum(pplds, axis=0)  # total points per label distance
+    ppl = np.sum(ppld, axis=1)  # total points per label
+    ppd = np.sum(ppld, axis=0)  # total points per distance
+
+    ppds = np.sum(pplds, axis=1)  # points per distance sequence
+    ppls = np.sum(pplds, axis=2)  # points per label sequence
+
+    totals = collections.OrderedDict(
+        zip(total_statistics, [ppld, ppd, ppl, ppds, ppls])
+    )
+
+    # optional statistics are only summed if they were computed
+    for name in summed_statistics:
+        keys = [get_sequence_key(s, name) for s in sequences]
+        if not keys or not all(key in statistics for key in keys):
+            continue
+        total = create_empty_like(statistics[keys[0]])
+        for key in keys:
+            accumulate({name: total}, {name: statistics[key]})
+        totals["total_" + name] = total
+    return totals
+
+
+def get_sequence_statistics(statistics: dict, sequence: int) -> dict:
+    """ Return all statistics of a sequence without the sequence prefix """
+    prefix = get_sequence_key(sequence, "")
+    return collections.OrderedDict(
+        (key[len(prefix) :], value)
+        for key, value in sorted(statistics.items())
+        if key.startswith(prefix)
+    )
+
+
+def get_stored_sequences(statistics: dict) -> list:
+    """ Return the ids of the sequences that are contained in the statistics """
+    return sorted(set(int(key[:2]) for key in statistics if is_sequence_key(key)))
+
+
+def get_stored_axes(statistics: dict) -> tuple:
+    """ Return the axes for which label matrices are contained in the statistics """
+    keys = set(key[3:] for key in statistics)
+    return tuple(name for name in axis_registry if get_axis_key(name) in keys)
+
+
+def get_metadata() -> dict:
+    """ Return the description of the bins and labels the statistics refer to """
+    metadata = {
+        "distance_bins": np.asarray(distance_bins),
+        "azimuth_bins": np.asarray(azimuth_bins),
+        "elevation_bins": np.asarray(elevation_bins),
+        "instance_extent_bins": np.asarray(instance_extent_bins),
+        "track_lifetime_bins": np.asarray(track_lifetime_bins),
+        "track_reappearance_bins": np.asarray(track_reappearance_bins),
+        "track_displacement_bins": np.asarray(track_displacement_bins),
+        "voxel_size": np.asarray(voxel_size),
+        "voxel_range": np.asarray(voxel_range),
+        "range_image_width": np.asarray(range_image_width),
+        "distribution_accuracy": np.asarray(distribution_accuracy),
+        "distribution_range": np.asarray(distribution_range),
+        "label_names": np.asarray(get_names_learning()[0]),
+        "fingerprint": np.asarray(get_fingerprint()),
+    }
+    for name, axis in axis_registry.items():
+        metadata.setdefault(name + "_bins", axis.edges)
+    return metadata
+
+
+def save_statistics(
+    save_dir: str, statistics: dict, filename: str = store_filename
+) -> str:
+    """ Save all statistics of a run together with the metadata into one npz file """
+    if not os.path.exists(save_dir):
+        os.makedirs(save_dir)
+
+    filename = os.path.join(save_dir, filename)
+    content = get_metadata()
+    content.update(pack_statistics(statistics))
+    np.savez_compressed(filename, **content)
+    return filename
+
+
+def load_statistics(path: str, check_fingerprint: bool = True) -> dict:
+    """ Load all statistics of a run
+
+    PATH is the npz file or the folder it is located in. Folders without an npz file
+    are read from the csv files of earlier runs. Statistics that were computed with
+    other bins or label mapping are rejected, unless check_fingerprint is False.
+    """
+    if os.path.isdir(path):
+        if not os.path.exists(os.path.join(path, store_filename)):
+            return load_csv(path)
+        path = os.path.join(path, store_filename)
+
+    with np.load(path) as content:
+        statistics = unpack_statistics({key: content[key] for key in content.files})
+
+    if check_fingerprint and str(statistics["fingerprint"]) != get_fingerprint():
+        raise ValueError(
+            "Statistics in {path} were computed with different bins or label "
+            "mapping".format(path=path)
+        )
+    return statistics
+
+
+def get_summary(statistics: dict) -> dict:
+    """ Return a short description of stored statistics, one string per entry """
+    summary = collections.OrderedDict()
+    if "fingerprint" in statistics:
+        fingerprint = str(statistics["fingerprint"])
+        summary["fingerprint"] = fingerprint + (
+            " (matches the current bins and label mapping)"
+            if fingerprint == get_fingerprint()
+            else " (differs from the current {f})".format(f=get_fingerprint())
+        )
+    sequences = get_stored_sequences(statistics)
+    summary["sequences"] = ", ".join("{0:02d}".format(s) for s in sequences)
+    summary["axes"] = ", ".join(get_stored_axes(statistics))
+    summary["points"] = "{n:,}".format(
+        n=sum(
+            int(np.sum(statistics[get_sequence_key(s, "points_per_label")]))
+            for s in sequences
+        )
+    )
+    if "shard" in statistics:
+        summary["shard"] = "{i}/{n}, {c} of {t} scans".format(
+            i=int(statistics["shard"][0]),
+            n=int(statistics["shard"][1]),
+            c=len(statistics["scans"]),
+            t=len(statistics["dataset_scans"]),
+        )
+
+    names = set(key[3:] for key in statistics if is_sequence_key(key))
+    summary["optional"] = ", ".join(
+        description
+        for name, description in [
+            ("joint_histogram", "joint histogram"),
+            ("instances_per_label", "instances"),
+            ("tracks_per_label", "tracks"),
+            ("voxel_histogram", "voxels"),
+            ("range_image_scans", "range image"),
+            ("range_sketch", "distributions"),
+            ("points_per_label" + interval_suffix, "estimated from a sample"),
+        ]
+        if name in names
+    ) or "none"
+    return summary
+
+
+def get_partial_filename(shard: int, num_shards: int) -> str:
+    return "statistics_{0:03d}_of_{1:03d}.npz".format(shard, num_shards)
+
+
+def save_partial(
+    save_dir: str,
+    statistics: dict,
+    shard: int,
+    num_shards: int,
+    scans: list,
+    dataset_scans: list,
+) -> str:
+    """ Save the per-sequence statistics of one shard of a run, see merge_partials
+
+    Next to the metadata of every run, a partial holds the shard, the scans it covers
+    and all scans of the dataset, so the partials can be checked for gaps and overlaps.
+    """
+    content = collections.OrderedDict(
+        (key, value) for key, value in statistics.items() if is_sequence_key(key)
+    )
+    content["shard"] = np.array([shard, num_shards])
+    content["scans"] = np.asarray(scans, dtype=str)
+    content["dataset_scans"] = np.asarray(dataset_scans, dtype=str)
+    return save_statistics(
+        save_dir, content, filename=get_partial_filename(shard, num_shards)
+    )
+
+
+def find_partials(path: str) -> list:
+    """ Return the partial results in a folder or the file itself """
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, partial_pattern)))
+    return [path]
+
+
+def merge_partials(partials: list) -> dict:
+    """ Sum the per-sequence statistics of all shards of a run and add the totals
+
+    The result is the same as of a run over all scans at once. Raises a ValueError if
+    the partials differ in shards, dataset or statistics, or if scans are covered more
+    than once or not at all. Bins and label mapping are checked by load_statistics.
+    """
+    if not partials:
+        raise ValueError("No partial results to merge")
+
+    first = partials[0]
+    num_shards = int(first["shard"][1])
+    dataset_scans = set(first["dataset_scans"])
+    keys = sorted(key for key in first if is_sequence_key(key))
+
+    shards = set()
+    scans = set()
+    for partial in partials:
+        shard = int(partial["shard"][0])
+        if int(partial["shard"][1]) != num_shards:
+            raise ValueError("Partial results of different numbers of shards")
+        if shard in shards:
+            raise ValueError(
+                "Shard {i}/{n} is given twice".format(i=shard, n=num_shards)
+            )
+        if set(partial["dataset_scans"]) != dataset_scans:
+            raise ValueError(
+                "Shard {i}/{n} was computed on a different dataset".format(
+                    i=shard, n=num_shards
+                )
+            )
+        if sorted(key for key in partial if is_sequence_key(key)) != keys:
+            raise ValueError(
+                "Shard {i}/{n} holds different statistics (axes or joint)".format(
+                    i=shard, n=num_shards
+                )
+            )
+        overlap = scans.intersection(partial["scans"])
+        if overlap:
+            raise ValueError(
+                "{c} scans are covered by several shards, e.g. {s}".format(
+                    c=len(overlap), s=min(overlap)
+                )
+            )
+        shards.add(shard)
+        scans.update(partial["scans"])
+
+    missing = sorted(dataset_scans - scans)
+    if missing:
+        raise ValueError(
+            "{c} scans are not covered, e.g. {s}, missing shards: {m}".format(
+                c=len(missing),
+                s=missing[0],
+                m=sorted(set(range(num_shards)) - shards),
+            )
+        )
+
+    merged = collections.OrderedDict()
+    for key in keys:
+        merged[key] = create_empty_like(first[key])
+    for partial in partials:
+        accumulate(merged, {key: partial[key] for key in keys})
+
+    merged.update(get_total_statistics(merged, get_stored_sequences(merged)))
+    return merged
+
+
+def load_csv(path: str) -> dict:
+    """ Load the per-sequence statistics from csv files """
+    statistics = {}
+    for filename in sorted(os.listdir(path)):
+        key, ext = os.path.splitext(filename)
+        name = key[3:]
+        if ext == ".csv" and key[:2].isdigit() and name in sequence_statistics:
+            statistics[key] = np.loadtxt(
+                os.path.join(path, filename), delimiter=","
+            ).astype(np.int64)
+    return statistics
+
+
+def export_csv(save_dir: str, statistics: dict):
+    """ Save every statistic as a separate csv file """
+    if not os.path.exists(save_dir):
+        os.makedirs(save_dir)
+
+    for key, value in statistics.items():
+        if isinstance(value, (SparseHistogram, Moments)):
+            # the sparse histograms and moments are only available in the npz file
+            continue
+        fmt = "%d" if np.issubdtype(value.dtype, np.integer) else "%.6g"
+        np.savetxt(os.path.join(save_dir, key + ".csv"), value, fmt=fmt, delimiter=",")
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import collections
+
+import numpy as np
+from data import (
+    get_num_learning_labels,
+    track_displacement_bins,
+    track_lifetime_bins,
+    track_reappearance_bins,
+)
+
+from .compute import get_counts
+
+# observations of the instances of a scan, sent with the statistics of the scan
+frame_statistics = ["track_keys", "track_moving", "track_centers"]
+
+
+def get_frame_statistics(instances: dict) -> dict:
+    """ Return the instance keys, moving flags and centers of a scan, see TrackState """
+    statistics = collections.OrderedDict()
+    statistics["track_keys"] = instances["key"]
+    statistics["track_moving"] = instances["moving"]
+    statistics["track_centers"] = instances["center"]
+    return statistics
+
+
+class TrackState(object):
+    """ Rolling state of the instance tracks of a sequence
+
+    The scans are added in order with update. Only a few values per track (sorted by
+    instance key) and the instance counts per scan are kept, never the scans.
+    """
+
+    def __init__(self):
+        self.num_frames = 0
+        self.keys = np.zeros(0, np.int64)
+        self.first = np.zeros(0, np.int64)
+        self.last = np.zeros(0, np.int64)
+        self.reappearances = np.zeros(0, np.int64)
+        self.moving = np.zeros(0, bool)
+        self.start = np.zeros([0, 3])
+        self.end = np.zeros([0, 3])
+        self._has_poses = True
+        self._moving_per_frame = []
+        self._static_per_frame = []
+
+    def update(
+        self, keys: np.array, moving: np.array, centers: np.array, pose: np.array = None
+    ):
+        """ Add the sorted, unique instance keys of the next scan
+
+        With the pose of the scan, the centers are transformed into the frame of the
+        first scan, so the displacement of the tracks can be measured.
+        """
+        frame = self.num_frames
+        self.num_frames += 1
+
+        num_labels = get_num_learning_labels()
+        labels = np.right_shift(keys, 16)
+        self._moving_per_frame.append(np.bincount(labels[moving], minlength=num_labels))
+        self._static_per_frame.append(
+            np.bincount(labels[~moving], minlength=num_labels)
+        )
+
+        if pose is None:
+            self._has_poses = False
+        else:
+            centers = centers @ pose[:3, :3].T + pose[:3, 3]
+
+        indices = np.searchsorted(self.keys, keys)
+        found = indices < self.keys.shape[0]
+        found[found] = self.keys[indices[found]] == keys[found]
+
+        # tracks that were seen before
+        i = indices[found]
+        self.reappearances[i] += self.last[i] < frame - 1
+        self.last[i] = frame
+        self.moving[i] |= moving[found]
+        self.end[i] = centers[found]
+
+        # new tracks, inserted so the keys stay sorted
+        new = ~found
+        i = indices[new]
+        self.keys = np.insert(self.keys, i, keys[new])
+        self.first = np.insert(self.first, i, frame)
+        self.last = np.insert(self.last, i, frame)
+        self.reappearances = np.insert(self.reappearances, i, 0)
+        self.moving = np.insert(self.moving, i, moving[new])
+        self.start = np.insert(self.start, i, centers[new], axis=0)
+        self.end = np.insert(self.end, i, centers[new], axis=0)
+
+    def get_statistics(self) -> dict:
+        """ Return the track statistics of the scans added so far
+
+        Per label, the number of tracks, the number of tracks that were moving in any
+        scan and the tracks over their lifetime (scans from first to last appearance),
+        their reappearances after missing scans and, if all scans had a pose, their
+        displacement. Per scan and label, the number of moving and static instances.
+        """
+        num_labels = get_num_learning_labels()
+        labels = np.right_shift(self.keys, 16)
+
+        statistics = collections.OrderedDict()
+        statistics["tracks_per_label"] = np.bincount(labels, minlength=num_labels)
+        statistics["moving_tracks_per_label"] = np.bincount(
+            labels[self.moving], minlength=num_labels
+        )
+        statistics["track_lifetime_label_matrix"] = get_counts(
+            self.last - self.first + 1,
+            labels,
+            num_labels,
+            np.asarray(track_lifetime_bins),
+        )
+        statistics["track_reappearance_label_matrix"] = get_counts(
+            self.reappearances, labels, num_labels, np.asarray(track_reappearance_bins)
+        )
+        if self._has_poses and self.num_frames > 0:
+            statistics["track_displacement_label_matrix"] = get_counts(
+                np.linalg.norm(self.end - self.start, 2, axis=1),
+                labels,
+                num_labels,
+                np.asarray(track_displacement_bins),
+            )
+        statistics["moving_instances_per_frame"] = np.reshape(
+            self._moving_per_frame, (-1, num_labels)
+        ).astype(np.int64)
+        statistics["static_instances_per_frame"] = np.reshape(
+            self._static_per_frame, (-1, num_labels)
+        ).astype(np.int64)
+        return statistics
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+__author__ = """Larissa Triess"""
+__email__ = "larissa@triess.eu"
+
+import numpy as np
+from data import get_num_learning_labels, voxel_range, voxel_size
+
+from .profiling import profiler
+from .sparse import SparseHistogram
+
+
+def get_voxel_shape() -> tuple:
+    """ Return the shape of the label x X x Y x Z voxel histogram """
+    return tuple(
+        [get_num_learning_labels()]
+        + [int(round((upper - lower) / voxel_size)) for lower, upper in voxel_range]
+    )
+
+
+def get_voxel_statistics(coordinates: np.array, labels: np.array) -> dict:
+    """ Count the points per label and voxel of a scan
+
+    The coordinates are quantized to the voxel grid around the sensor and combined with
+    the label into one linear key per point, so only the occupied voxels are stored.
+    Points outside of the grid are not counted.
+    """
+    labels = labels.reshape(-1)
+    shape = get_voxel_shape()
+
+    with profiler.stage("voxel stats", points=labels.shape[0]):
+        lower = np.array([r[0] for r in voxel_range])
+        indices = np.floor((coordinates - lower) / voxel_size)
+        valid = np.logical_and(
+            np.all(np.logical_and(indices >= 0, indices < shape[1:]), axis=1),
+            labels < shape[0],
+        )
+        keys = np.ravel_multi_index(
+            (labels[valid],) + tuple(indices[valid].astype(np.int64).T), shape
+        )
+        return {"voxel_histogram": SparseHistogram.from_keys(shape, keys)}
+
+
+def get_bev_heatmaps(voxels: SparseHistogram) -> np.array:
+    """ Return the points per label and bird's eye view cell (label x X x Y) """
+    return voxels.marginalize((0, 1, 2))